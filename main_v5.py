@@ -1,17 +1,26 @@
 import asyncio
 import logging
 import json
-import secrets
+import itertools
 import random
 import math
 from contextlib import asynccontextmanager
+from enum import IntEnum
 from typing import List, Dict, Optional
 
+import numpy as np
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import Response
 from pydantic import BaseModel
 
+# --- JOB STATES ---
+class JobStatus(IntEnum):
+    PENDING = 0
+    RUNNING = 1
+    COMPLETED = 2
+    FAILED = 3
+
 # --- DATA MODEL ---
 DATA_FILE = "orquanta_v5_dna.json"
 
@@ -23,6 +32,7 @@ class PolicyDNA:
         self.w_risk = 0.2      # Aversion to failure risk
         self.personality = "Balanced"
         self.history = []
+        self._cached_dict = None
 
     def mutate(self, outcome: dict):
         # Outcome: { "success": bool, "cost_overrun": bool, "latency_spike": bool }
@@ -59,6 +69,7 @@ class PolicyDNA:
         return old_dna, self, delta
 
     def update_personality(self):
+        self._cached_dict = None  # Weights changed: next to_dict() rebuilds
         if self.w_risk > 0.5: self.personality = "Paranoid/Safe"
         elif self.w_perf > 0.6: self.personality = "Speed Demon"
         elif self.w_cost > 0.6: self.personality = "Penny Pincher"
@@ -70,10 +81,34 @@ class PolicyDNA:
         return d
     
     def to_dict(self):
-        return {"v": self.version, "cost": round(self.w_cost,2), "perf": round(self.w_perf,2), "risk": round(self.w_risk,2), "trait": self.personality}
+        if self._cached_dict is None:
+            self._cached_dict = {"v": self.version, "cost": round(self.w_cost,2), "perf": round(self.w_perf,2), "risk": round(self.w_risk,2), "trait": self.personality}
+        return self._cached_dict
 
 dna = PolicyDNA()
 jobs_db = {}
+running_jobs: Dict[str, None] = {} # Insertion-ordered index of running job ids (oldest first)
+
+# --- DECISION OPTIONS ---
+# Columns: cost score, perf score, 1 - risk score (so every column is "higher is better")
+HW = ["8x H100", "8x A100", "8x T4"]
+OPTS = np.array([
+    [0.1, 0.9, 1 - 0.1], # Expensive, Fast, Safe
+    [0.4, 0.6, 1 - 0.3], # Mid
+    [0.9, 0.2, 1 - 0.8], # Cheap, Slow, Risky
+], dtype=np.float32)
+
+# --- JOB IDS ---
+# Display IDs only need to be unique, not unpredictable: a counter avoids a CSPRNG read per submit
+_BASE36 = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+_job_ctr = itertools.count(1)
+
+def _jid(prefix: str) -> str:
+    n, digits = next(_job_ctr), ""
+    while n:
+        n, r = divmod(n, 36)
+        digits = _BASE36[r] + digits
+    return f"{prefix}-{digits}"
 
 # --- FRONTEND ---
 HTML_CONTENT = """
@@ -168,6 +203,14 @@ HTML_CONTENT = """
         ws.onmessage = (e) => {
             const d = JSON.parse(e.data);
             
+            if(d.type === 'EVENT') {
+                // Coalesced update: one frame carries every change from a single mutation
+                const ev = d.payload;
+                if(ev.sync) renderJobs(ev.sync);
+                if(ev.dna) updateDNA(ev.dna);
+                if(ev.mutation) logMutation(ev.mutation);
+                if(ev.logs) ev.logs.forEach(appendLog);
+            }
             if(d.type === 'DNA') {
                 updateDNA(d.payload);
             }
@@ -178,16 +221,20 @@ HTML_CONTENT = """
                 renderJobs(d.payload);
             }
             if(d.type === 'LOG') {
-                const l = document.getElementById('sys-log');
-                const el = document.createElement('div');
-                el.innerText = `> ${d.payload}`;
-                el.style.marginBottom = '4px';
-                if(d.payload.includes('REJECTED')) el.style.color = '#ffaa00';
-                l.appendChild(el);
-                l.scrollTop = l.scrollHeight;
+                appendLog(d.payload);
             }
         };
 
+        function appendLog(msg) {
+            const l = document.getElementById('sys-log');
+            const el = document.createElement('div');
+            el.innerText = `> ${msg}`;
+            el.style.marginBottom = '4px';
+            if(msg.includes('REJECTED')) el.style.color = '#ffaa00';
+            l.appendChild(el);
+            l.scrollTop = l.scrollHeight;
+        }
+
         function updateDNA(dna) {
             document.getElementById('pol-ver').innerText = 'v' + dna.v;
             
@@ -214,19 +261,45 @@ HTML_CONTENT = """
             c.prepend(el);
         }
 
+        // Mirrors the server-side JobStatus IntEnum
+        const STATUS = ['pending', 'running', 'completed', 'failed'];
+
+        const STATUS_COLOR = ['#fff', '#fff', '#00ffcc', '#ff0044'];
+        const jobEls = new Map(); // job id -> {el, st, status}
+
         function renderJobs(jobs) {
+            // Keyed patch: create new cards, touch only changed statuses, drop vanished ids
             const c = document.getElementById('jobs');
-            c.innerHTML = '';
+            const seen = new Set();
             jobs.forEach(j => {
-                const el = document.createElement('div');
-                el.className = 'job-card';
-                el.innerHTML = `
-                    <h3>${j.id}</h3>
-                    <div class="status" style="color:${j.status==='failed'?'#ff0044':(j.status==='completed'?'#00ffcc':'#fff')}">${j.status}</div>
-                    <div style="font-size:12px;">${j.hardware}</div>
-                    <div style="font-size:11px; color:#666; margin-top:5px;">Policy Score: ${j.score.toFixed(2)}</div>
-                `;
-                c.appendChild(el);
+                seen.add(j.id);
+                let card = jobEls.get(j.id);
+                if(!card) {
+                    const el = document.createElement('div');
+                    el.className = 'job-card';
+                    el.id = `job-${j.id}`;
+                    el.innerHTML = `
+                        <h3></h3>
+                        <div class="status"></div>
+                        <div style="font-size:12px;"></div>
+                        <div style="font-size:11px; color:#666; margin-top:5px;"></div>
+                    `;
+                    const [h, st, hw, sc] = el.children;
+                    h.textContent = j.id;
+                    hw.textContent = j.hardware;
+                    sc.textContent = `Policy Score: ${j.score.toFixed(2)}`;
+                    card = {el, st, status: -1};
+                    jobEls.set(j.id, card);
+                    c.appendChild(el);
+                }
+                if(card.status !== j.status) {
+                    card.status = j.status;
+                    card.st.textContent = STATUS[j.status];
+                    card.st.style.color = STATUS_COLOR[j.status];
+                }
+            });
+            jobEls.forEach((card, id) => {
+                if(!seen.has(id)) { card.el.remove(); jobEls.delete(id); }
             });
         }
 
@@ -242,14 +315,20 @@ HTML_CONTENT = """
 </body>
 </html>
 """
+# Encoded once at import; GET / serves these bytes as-is
+_HTML_BYTES = HTML_CONTENT.encode("utf-8")
+_HTML_RESPONSE_HEADERS = {"cache-control": "public, max-age=60", "content-type": "text/html; charset=utf-8"}
 
 # --- BACKEND ---
 class Nexus:
     def __init__(self): self.socks = []
     async def broadcast(self, t, p):
-        for s in self.socks: 
-            try: await s.send_json({"type":t, "payload":p})
-            except: pass
+        # Encode once and push the same text frame to every client (send_json re-encodes per socket)
+        frame = json.dumps({"type":t, "payload":p}, separators=(",", ":"), ensure_ascii=False)
+        await asyncio.gather(*(s.send_text(frame) for s in self.socks), return_exceptions=True)
+    async def broadcast_many(self, events):
+        # Fuse several updates ({"sync":..., "dna":..., "mutation":..., "logs":[...]}) into one frame
+        await self.broadcast("EVENT", events)
 nexus = Nexus()
 
 app = FastAPI()
@@ -267,56 +346,56 @@ async def ws_ep(ws: WebSocket):
 class IntentReq(BaseModel): text: str
 
 @app.get("/")
-def ui(): return HTMLResponse(HTML_CONTENT)
+def ui(): return Response(content=_HTML_BYTES, headers=_HTML_RESPONSE_HEADERS)
 
 @app.post("/api/v1/intent")
 async def intent(r: IntentReq):
     # DECISION ENGINE BASED ON DNA
-    opts = [
-        {"hw": "8x H100", "cost": 0.1, "perf": 0.9, "risk": 0.1}, # Expensive, Fast, Safe
-        {"hw": "8x A100", "cost": 0.4, "perf": 0.6, "risk": 0.3}, # Mid
-        {"hw": "8x T4",   "cost": 0.9, "perf": 0.2, "risk": 0.8}  # Cheap, Slow, Risky
-    ]
-    
-    # Calculate Scores
-    best_score = -1
-    selected = None
-    
-    for opt in opts:
-        # Score = (w_cost * cost_score) + (w_perf * perf_score) + (w_risk * (1-risk_score))
-        score = (dna.w_cost * opt['cost']) + (dna.w_perf * opt['perf']) + (dna.w_risk * (1 - opt['risk']))
-        if score > best_score:
-            best_score = score
-            selected = opt
+    # Score = (w_cost * cost_score) + (w_perf * perf_score) + (w_risk * (1-risk_score))
+    w = np.array([dna.w_cost, dna.w_perf, dna.w_risk], dtype=np.float32)
+    scores = OPTS @ w
+    i = int(scores.argmax())
+    selected, best_score = HW[i], float(scores[i])
     
     # Commit
-    jid = f"SOV-{secrets.token_hex(2).upper()}"
-    jobs_db[jid] = {"id": jid, "status": "running", "hardware": selected['hw'], "score": best_score}
-    await nexus.broadcast("SYNC", list(jobs_db.values()))
-    await nexus.broadcast("LOG", f"Deployed {selected['hw']} (Score: {best_score:.2f}) based on {dna.personality} policy.")
+    jid = _jid("SOV")
+    jobs_db[jid] = {"id": jid, "status": JobStatus.RUNNING, "hardware": selected, "score": best_score}
+    running_jobs[jid] = None
+    await nexus.broadcast_many({
+        "sync": list(jobs_db.values()),
+        "logs": [f"Deployed {selected} (Score: {best_score:.2f}) based on {dna.personality} policy."],
+    })
     return {"id": jid}
 
 @app.post("/api/v1/chaos")
 async def chaos():
     # Force failure on running job to trigger evolution
-    run = [j for j in jobs_db.values() if j['status'] == 'running']
-    if run:
-        j = run[0]
-        j['status'] = 'failed'
-        await nexus.broadcast("SYNC", list(jobs_db.values()))
-        await nexus.broadcast("LOG", f"CRITICAL FAILURE on {j['id']}. Calculating Regret...")
+    jid = next(iter(running_jobs), None)
+    if jid:
+        j = jobs_db[jid]
+        j['status'] = JobStatus.FAILED
+        del running_jobs[jid]
         
         # MUTATE DNA
         old_snap = dna.to_dict()
         _, _, delta = dna.mutate({"success": False, "cost_overrun": False, "latency_spike": False})
         new_snap = dna.to_dict()
         
-        await nexus.broadcast("DNA", new_snap)
-        await nexus.broadcast("MUTATION", {"old": old_snap, "new": new_snap, "delta": delta})
-        await nexus.broadcast("LOG", f"POLICY EVOLVED: {delta['reason']}")
+        await nexus.broadcast_many({
+            "sync": list(jobs_db.values()),
+            "dna": new_snap,
+            "mutation": {"old": old_snap, "new": new_snap, "delta": delta},
+            "logs": [
+                f"CRITICAL FAILURE on {j['id']}. Calculating Regret...",
+                f"POLICY EVOLVED: {delta['reason']}",
+            ],
+        })
         return {"status": "evolved"}
     return {"status": "no_active_jobs"}
 
 if __name__ == "__main__":
+    import sys
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # uvloop/httptools ship with uvicorn[standard]; uvloop has no Windows build
+    loop = "asyncio" if sys.platform == "win32" else "uvloop"
+    uvicorn.run(app, host="0.0.0.0", port=8000, loop=loop, http="httptools", ws="websockets")
@@ -1,24 +1,43 @@
 import asyncio
 import logging
 import json
-import secrets
+import itertools
 import os
 import math
+import struct
+import zlib
+from collections import deque
 from contextlib import asynccontextmanager
 from typing import List, Dict, Optional
 from datetime import datetime
+from enum import IntEnum
 
-from fastapi import FastAPI, BackgroundTasks, HTTPException
+import msgspec
+import numpy as np
+from fastapi import FastAPI, BackgroundTasks, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 
+logger = logging.getLogger(__name__)
+
 # --- CONSTANTS ---
-POLICY_FILE = "orquanta_policy_v8.json"
+POLICY_FILE = "orquanta_policy_v8.log"          # Append-mostly msgpack snapshot log
+POLICY_STATE_FILE = "orquanta_policy_v8.json"   # Current weights sidecar (O(1) startup)
+FRAME_HEADER = struct.Struct(">I")              # Big-endian u32 length prefix
+HISTORY_LIMIT = 1024                            # Snapshots kept in memory and across restarts
+LOG_COMPACT_FRAMES = 2 * HISTORY_LIMIT          # Rewrite the log to the ring buffer past this
+FLUSH_INTERVAL = 0.25                           # Seconds between coalesced disk writes
+PHYSICS_DELAY = 0.5                             # Simulated runtime before a job resolves
+PHYSICS_BATCH = 64                              # Max jobs resolved per physics tick
 
 # --- INFRASTRUCTURE PHYSICS ---
 class HardwareSpec:
     def __init__(self, name, vram_gb, cost, reliability):
         self.name, self.vram_gb, self.cost, self.reliability = name, vram_gb, cost, reliability
+        # Specs are immutable, so the normalized scoring features are computed once
+        self.n_cost = 1.0 - min(1.0, cost / 6.0)
+        self.n_perf = min(1.0, vram_gb / 100.0)
+        self.n_risk = reliability
 
 HARDWARE = {
     "T4": HardwareSpec("T4", 16, 0.4, 0.95),
@@ -26,47 +45,90 @@ HARDWARE = {
     "H100": HardwareSpec("H100", 80, 5.0, 0.9999)
 }
 
+# Normalized (cost, perf, risk) features per hardware, one row each — scored with a single gemv
+HW_NAMES = np.array(list(HARDWARE))
+HW_FEATURES = np.array([[hw.n_cost, hw.n_perf, hw.n_risk] for hw in HARDWARE.values()], dtype=np.float32)
+
+# --- JOB STATES ---
+class JobStatus(IntEnum):
+    PENDING = 0
+    RUNNING = 1
+    COMPLETED = 2
+    FAILED = 3
+
+# --- JOB IDS ---
+# Display IDs only need to be unique, not unpredictable: a counter avoids a CSPRNG read per submit
+_BASE36 = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+_job_ctr = itertools.count(1)
+
+def _jid(prefix: str) -> str:
+    n, digits = next(_job_ctr), ""
+    while n:
+        n, r = divmod(n, 36)
+        digits = _BASE36[r] + digits
+    return f"{prefix}-{digits}"
+
 # --- SOVEREIGN POLICY WITH SAFETY ---
+WEIGHT_KEYS = ("cost", "perf", "risk")          # Order of the weight vector (matches HW_FEATURES columns)
+DEFAULT_WEIGHTS = np.array([0.8, 0.1, 0.1])     # Default: Cost-focused
+BASELINE_WEIGHTS = np.array([0.5, 0.3, 0.2])    # Decay target
+DECAY_RATE = 0.05
+
+class Snapshot(msgspec.Struct):
+    v: int
+    ts: str
+    cause: str
+    weights: dict
+    delta: dict
+
+_encoder = msgspec.msgpack.Encoder()
+_decoder = msgspec.msgpack.Decoder(Snapshot)
+
 class ProductionPolicy:
     def __init__(self):
         self.version = 1
-        self.weights = {"cost": 0.8, "perf": 0.1, "risk": 0.1} # Default: Cost-focused
-        self.history = [] # List of snapshots
+        self._w = DEFAULT_WEIGHTS.copy() # (cost, perf, risk) vector shared by every hot path
+        self.history = deque(maxlen=HISTORY_LIMIT) # Ring buffer of recent snapshots
+        self._by_version = {} # v -> snapshot, mirrors the ring buffer for O(1) rollback
+        self._pending = [] # Snapshots not yet appended to the log
+        self._dirty = False # State changed since the last flush
+        self._log_frames = 0 # Frames in POLICY_FILE, written or queued
+        self._eval_cache = None # Last evaluate() result, valid while the version is unchanged
         self.load()
 
-    def clamp(self, val):
-        return max(0.05, min(0.95, val))
+    @property
+    def weights(self) -> Dict[str, float]:
+        # Dict view for serialization and the API; hot paths use self._w directly
+        return dict(zip(WEIGHT_KEYS, self._w.tolist()))
+
+    @weights.setter
+    def weights(self, w: Dict[str, float]):
+        self._w = np.array([w[k] for k in WEIGHT_KEYS], dtype=np.float64)
 
     def normalize(self):
-        total = sum(self.weights.values())
-        for k in self.weights: 
-            self.weights[k] = self.clamp(self.weights[k] / total)
-        # Re-normalize after clamp
-        total = sum(self.weights.values())
-        for k in self.weights: self.weights[k] /= total
+        # Scale to sum=1, clamp to [0.05, 0.95], re-scale
+        self._w /= self._w.sum()
+        np.clip(self._w, 0.05, 0.95, out=self._w)
+        self._w /= self._w.sum()
+
+    def etag(self) -> str:
+        # Weights go into the tag too: decay changes them without a new version
+        return f'"{self.version}-{zlib.crc32(self._w.tobytes()):08x}"'
 
     def evaluate(self, req_vram: int) -> Dict:
-        scores = {}
-        for name, hw in HARDWARE.items():
-            n_cost = 1.0 - min(1.0, hw.cost / 6.0)
-            n_perf = min(1.0, hw.vram_gb / 100.0)
-            n_risk = hw.reliability
-            
-            score = (self.weights["cost"] * n_cost) + \
-                    (self.weights["perf"] * n_perf) + \
-                    (self.weights["risk"] * n_risk)
-            scores[name] = score
-
-        best_hw = max(scores, key=scores.get)
-        return {"decision": best_hw, "scores": scores, "policy_v": self.version}
+        # Scores depend only on the weights, so one result per policy version suffices
+        if self._eval_cache is not None and self._eval_cache["policy_v"] == self.version:
+            return self._eval_cache
+        scores = HW_FEATURES @ self._w
+        best_hw = str(HW_NAMES[int(scores.argmax())])
+        self._eval_cache = {"decision": best_hw, "scores": dict(zip(HW_NAMES.tolist(), scores.tolist())), "policy_v": self.version}
+        return self._eval_cache
 
     def mutate(self, cause: str, impact_matrix: Dict[str, float]):
-        prev = self.weights.copy()
+        prev = self._w.copy()
         
         # Apply Impact
-        for k, impact in impact_matrix.items():
-            if k in self.weights:
-                self.weights[k] += impact
+        self._w += np.array([impact_matrix.get(k, 0.0) for k in WEIGHT_KEYS])
         
         self.normalize() # Enforce Bounds & Sum=1.0
         
@@ -75,104 +137,206 @@ class ProductionPolicy:
             "v": self.version,
             "ts": datetime.now().isoformat(),
             "cause": cause,
-            "weights": self.weights.copy(),
-            "delta": {k: self.weights[k] - prev[k] for k in self.weights}
+            "weights": self.weights,
+            "delta": dict(zip(WEIGHT_KEYS, (self._w - prev).tolist()))
         }
-        self.history.append(snapshot)
-        self.save()
+        self.record(snapshot)
+        self._pending.append(snapshot)
+        self._dirty = True
         return snapshot
 
+    def record(self, snapshot: Dict):
+        if len(self.history) == self.history.maxlen:
+            oldest = self.history[0]
+            # After a rollback a newer snapshot may own this version number
+            if self._by_version.get(oldest["v"]) is oldest:
+                del self._by_version[oldest["v"]]
+        self.history.append(snapshot)
+        self._by_version[snapshot["v"]] = snapshot
+
     def rollback(self, target_version: int):
-        target = next((h for h in self.history if h["v"] == target_version), None)
+        target = self._by_version.get(target_version)
         if not target and target_version == 1:
              # Reset to baseline
-             target = {"weights": {"cost": 0.8, "perf": 0.1, "risk": 0.1}}
+             target = {"weights": dict(zip(WEIGHT_KEYS, DEFAULT_WEIGHTS.tolist()))}
         
         if target:
-            self.weights = target["weights"].copy()
+            self.weights = target["weights"]
             self.version = target_version
-            self.save()
+            self._eval_cache = None
+            self._dirty = True
             return True
         return False
 
     def decay(self):
         # Slowly drift back to baseline to prevent overfitting
-        BASELINE = {"cost": 0.5, "perf": 0.3, "risk": 0.2}
-        DECAY_RATE = 0.05
-        
-        changed = False
-        for k in self.weights:
-            diff = BASELINE[k] - self.weights[k]
-            if abs(diff) > 0.01:
-                self.weights[k] += (diff * DECAY_RATE)
-                changed = True
+        diff = BASELINE_WEIGHTS - self._w
+        drifted = np.abs(diff) > 0.01
         
-        if changed:
+        if drifted.any():
+            self._w[drifted] += diff[drifted] * DECAY_RATE
             self.normalize()
-            self.save()
+            self._eval_cache = None
+            self._dirty = True
+
+    def _drain(self):
+        # Runs on the event loop: hand off pending frames + current state for writing
+        frames, self._pending = self._pending, []
+        self._dirty = False
+        self._log_frames += len(frames)
+        compact = self._log_frames > LOG_COMPACT_FRAMES
+        if compact:
+            # Rewrite the log as the ring buffer, which already holds the new frames
+            frames = list(self.history)
+            self._log_frames = len(frames)
+        return frames, {"v": self.version, "w": self.weights}, compact
 
-    def save(self):
-        with open(POLICY_FILE, "w") as f:
-            json.dump({"v": self.version, "w": self.weights, "h": self.history}, f, indent=2)
+    def _save_sync(self, frames, state, compact=False):
+        if frames:
+            # One length-prefixed frame per mutation: O(1) instead of rewriting the history
+            bufs = [_encoder.encode(Snapshot(**snap)) for snap in frames]
+            data = b"".join(FRAME_HEADER.pack(len(buf)) + buf for buf in bufs)
+            if compact:
+                # Amortized O(1) too: one rewrite per HISTORY_LIMIT appends
+                with open(POLICY_FILE + ".tmp", "wb") as f:
+                    f.write(data)
+                os.replace(POLICY_FILE + ".tmp", POLICY_FILE)
+            else:
+                with open(POLICY_FILE, "ab") as f:
+                    f.write(data)
+        with open(POLICY_STATE_FILE, "w") as f:
+            json.dump(state, f)
+
+    async def asave(self):
+        # Capture state on the loop, do the blocking file I/O on a worker thread.
+        # A cancelled caller still holds the lock until its write has finished.
+        async with _policy_io:
+            write = asyncio.ensure_future(asyncio.to_thread(self._save_sync, *self._drain()))
+            try:
+                await asyncio.shield(write)
+            except asyncio.CancelledError:
+                await asyncio.wait([write])
+                raise
 
     def load(self):
         if os.path.exists(POLICY_FILE):
             try:
-                with open(POLICY_FILE, "r") as f:
+                with open(POLICY_FILE, "rb") as f:
+                    while header := f.read(FRAME_HEADER.size):
+                        (size,) = FRAME_HEADER.unpack(header)
+                        snap = _decoder.decode(f.read(size))
+                        self.record(msgspec.structs.asdict(snap))
+                        self._log_frames += 1
+                        self.version, self.weights = snap.v, snap.weights
+            except: pass
+        if os.path.exists(POLICY_STATE_FILE):
+            try:
+                with open(POLICY_STATE_FILE, "r") as f:
                     d = json.load(f)
                     self.version = d["v"]
                     self.weights = d["w"]
-                    self.history = d["h"]
             except: pass
 
+_policy_io = asyncio.Lock() # Serializes policy file writes (asave) and deletion (/reset)
 policy = ProductionPolicy()
 jobs_db = {}
+_physics_q: Optional[asyncio.Queue] = None # Submitted job ids awaiting resolution (created in lifespan)
 
 # --- API ---
-app = FastAPI(title="OrQuanta v3.7 Production")
+async def _flusher():
+    # Coalesce bursts of mutations into one disk write per interval
+    while True:
+        await asyncio.sleep(FLUSH_INTERVAL)
+        if policy._dirty:
+            try:
+                await policy.asave()
+            except Exception:
+                # The drained frames miss the log; retry the state on the next tick
+                logger.exception("Policy flush failed")
+                policy._dirty = True
+
+async def _physics_worker():
+    # Resolve every job submitted within one PHYSICS_DELAY window together
+    while True:
+        batch = [await _physics_q.get()]
+        await asyncio.sleep(PHYSICS_DELAY)
+        while len(batch) < PHYSICS_BATCH and not _physics_q.empty():
+            batch.append(_physics_q.get_nowait())
+        try:
+            resolve_jobs(batch)
+        except Exception:
+            logger.exception("Resolving %d jobs failed", len(batch))
+            for jid in batch:
+                job = jobs_db.get(jid)
+                if job is not None and job["status"] == JobStatus.PENDING:
+                    job["status"] = JobStatus.FAILED
+                    job["error"] = "INTERNAL_ERROR"
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global _physics_q
+    _physics_q = asyncio.Queue()
+    # Plain tasks: the workers log their own errors, so neither can cancel the lifespan
+    workers = [asyncio.create_task(_flusher()), asyncio.create_task(_physics_worker())]
+    yield
+    for w in workers: w.cancel()
+    await asyncio.gather(*workers, return_exceptions=True) # Returns once an in-flight flush is written
+    await policy.asave()
+
+app = FastAPI(title="OrQuanta v3.7 Production", lifespan=lifespan)
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
 
 class JobReq(BaseModel):
     intent: str
     required_vram: int
 
-async def physics_loop(jid):
-    await asyncio.sleep(0.5)
-    job = jobs_db[jid]
-    hw = HARDWARE[job["decision"]]
+def resolve_jobs(jids: List[str]):
+    oom = []
+    for jid in jids:
+        job = jobs_db.get(jid)
+        if job is None: continue # Dropped by /reset while in flight
+        if HARDWARE[job["decision"]].vram_gb < job["req_vram"]:
+            job["status"] = JobStatus.FAILED
+            job["error"] = "OOM_ERROR"
+            oom.append(job)
+        else:
+            job["status"] = JobStatus.COMPLETED
     
-    if hw.vram_gb < job["req_vram"]:
-        job["status"] = "failed"
-        job["error"] = "OOM_ERROR"
-        # MUTATE: Drastic Risk Increase
+    if oom:
+        # MUTATE: Drastic Risk Increase, one aggregated mutation per batch
+        n = len(oom)
         evt = policy.mutate(
-            f"OOM Failure on {jid}", 
-            {"risk": 0.6, "perf": 0.4, "cost": -0.7} # Aggressive penalty
+            f"OOM Failure on {', '.join(job['id'] for job in oom)}",
+            {"risk": 0.6 * n, "perf": 0.4 * n, "cost": -0.7 * n} # Aggressive penalty
         )
-        job["mutation"] = evt
-    else:
-        job["status"] = "completed"
+        for job in oom: job["mutation"] = evt
 
 @app.post("/api/v1/submit")
 async def submit(r: JobReq):
     eval_res = policy.evaluate(r.required_vram)
-    jid = f"JOB-{secrets.token_hex(2).upper()}"
+    jid = _jid("JOB")
     jobs_db[jid] = {
-        "id": jid, "status": "pending", "decision": eval_res["decision"],
+        "id": jid, "status": JobStatus.PENDING, "decision": eval_res["decision"],
         "req_vram": r.required_vram, "policy_v": policy.version
     }
-    asyncio.create_task(physics_loop(jid))
+    _physics_q.put_nowait(jid)
     return {"id": jid, "decision": eval_res["decision"]}
 
 @app.get("/api/v1/policy")
-def get_policy():
+def get_policy(request: Request, response: Response):
+    etag = policy.etag()
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
     return {"version": policy.version, "weights": policy.weights}
 
 @app.post("/api/v1/policy/rollback/{v}")
 def rollback(v: int):
     success = policy.rollback(v)
     if not success: raise HTTPException(404, "Version not found")
-    return {"status": "rolled_back", "current_version": policy.version}
+    # Carry the restored policy so clients can skip a follow-up GET /policy
+    return {"status": "rolled_back", "current_version": policy.version,
+            "version": policy.version, "weights": policy.weights}
 
 @app.post("/api/v1/policy/decay")
 def maintenance():
@@ -181,16 +345,26 @@ def maintenance():
 
 @app.get("/api/v1/jobs/{jid}")
 def get_job(jid: str):
-    return jobs_db.get(jid, {"error": "not found"})
+    job = jobs_db.get(jid)
+    if job is None: return {"error": "not found"}
+    return {**job, "status": job["status"].name.lower()}
+
+def _remove_policy_files():
+    for path in (POLICY_FILE, POLICY_STATE_FILE):
+        if os.path.exists(path): os.remove(path)
 
 @app.post("/api/v1/reset")
-def reset(payload: Dict = {}):
+async def reset(payload: Dict = {}):
     global policy, jobs_db
-    if os.path.exists(POLICY_FILE): os.remove(POLICY_FILE)
-    policy = ProductionPolicy()
+    async with _policy_io: # An in-flight flush finishes before the files go
+        await asyncio.to_thread(_remove_policy_files)
+        policy = ProductionPolicy()
     jobs_db = {}
     return {"status": "reset"}
 
 if __name__ == "__main__":
+    import sys
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # uvloop/httptools ship with uvicorn[standard]; uvloop has no Windows build
+    loop = "asyncio" if sys.platform == "win32" else "uvloop"
+    uvicorn.run(app, host="0.0.0.0", port=8000, loop=loop, http="httptools", ws="websockets")
@@ -20,17 +20,30 @@ Flags:
 from __future__ import annotations
 
 import argparse
+import contextvars
+import hashlib
+import json
+import logging
 import os
+import socket
 import subprocess
 import sys
+import sysconfig
+import threading
 import time
+import urllib.request
 import webbrowser
 import asyncio
+from functools import lru_cache
 from pathlib import Path
 
 ROOT = Path(__file__).parent
 V4   = ROOT / "v4"
 
+PREFLIGHT_DEPS  = ["fastapi", "uvicorn", "httpx", "pydantic"]
+PREFLIGHT_CACHE = ROOT / ".orquanta_preflight_cache"
+_ENV_PATH       = str(ROOT / ".env")
+
 # ─── ANSI Colors ──────────────────────────────────────────────────────────────
 RESET  = "\033[0m"
 BOLD   = "\033[1m"
@@ -52,38 +65,35 @@ def print_separator(char="─", width=62) -> None:
     print(c(DIM, char * width))
 
 
+# Header and status markers are fixed text, so they are colored once at import
+_HEADER_RULE = c(DIM, "═" * 62)
+_HEADER_LOGO = "\n".join([
+    c(BOLD + CYAN,   "        ██████  ██████  "),
+    c(BOLD + CYAN,   "       ██    ██ ██    ██"),
+    c(BOLD + PURPLE, "       ██    ██ ██    ██"),
+    c(BOLD + PURPLE, "        ██████  ██████  "),
+    "",
+    c(BOLD + WHITE,  "        OrQuanta Agentic v1.0"),
+    c(DIM,           "    Orchestrate. Optimize. Evolve."),
+])
+_HEADER_MODE = {
+    True:  c(YELLOW, "  ⚡ DEMO MODE — All clouds simulated"),
+    False: c(GREEN,  "  🚀 PRODUCTION MODE"),
+}
+_STATUS = {
+    "ok":   c(GREEN,  " ✓"),
+    "skip": c(DIM,    " --"),
+    "warn": c(YELLOW, " ⚠"),
+    "fail": c(RED,    " ✗"),
+}
+
+
 def print_header(demo: bool) -> None:
-    print()
-    print_separator("═")
-    print()
-    print(c(BOLD + CYAN,   "        ██████  ██████  "))
-    print(c(BOLD + CYAN,   "       ██    ██ ██    ██"))
-    print(c(BOLD + PURPLE, "       ██    ██ ██    ██"))
-    print(c(BOLD + PURPLE, "        ██████  ██████  "))
-    print()
-    print(c(BOLD + WHITE,  "        OrQuanta Agentic v1.0"))
-    print(c(DIM,           "    Orchestrate. Optimize. Evolve."))
-    print()
-    if demo:
-        print(c(YELLOW,    "  ⚡ DEMO MODE — All clouds simulated"))
-    else:
-        print(c(GREEN,     "  🚀 PRODUCTION MODE"))
-    print()
-    print_separator("═")
-    print()
+    print(f"\n{_HEADER_RULE}\n\n{_HEADER_LOGO}\n\n{_HEADER_MODE[demo]}\n\n{_HEADER_RULE}\n")
 
 
 def print_step(icon: str, text: str, status: str | None = None) -> None:
-    status_str = ""
-    if status == "ok":
-        status_str = c(GREEN, " ✓")
-    elif status == "skip":
-        status_str = c(DIM, " --")
-    elif status == "warn":
-        status_str = c(YELLOW, " ⚠")
-    elif status == "fail":
-        status_str = c(RED, " ✗")
-    print(f"  {icon}  {text}{status_str}")
+    print(f"  {icon}  {text}{_STATUS.get(status, '')}")
 
 
 # ─── Argument parsing ─────────────────────────────────────────────────────────
@@ -107,41 +117,72 @@ def parse_args() -> argparse.Namespace:
 
 # ─── Environment setup ────────────────────────────────────────────────────────
 
+@lru_cache(maxsize=2)
 def setup_env(demo: bool) -> dict:
-    env = os.environ.copy()
-    env["PYTHONPATH"] = str(ROOT)
-    if demo:
-        env["DEMO_MODE"]   = "true"
-        env["LOG_LEVEL"]   = "INFO"
-    else:
-        env["DEMO_MODE"]   = "false"
-        env.setdefault("LOG_LEVEL", "INFO")
-    return env
+    # One merged copy per mode; Popen copies env itself, so sharing it is safe
+    return {
+        **os.environ,
+        "PYTHONPATH": str(ROOT),
+        "DEMO_MODE":  "true" if demo else "false",
+        "LOG_LEVEL":  "INFO" if demo else os.environ.get("LOG_LEVEL", "INFO"),
+    }
 
 
 # ─── Health check ────────────────────────────────────────────────────────────
 
 def health_check(port: int, retries: int = 10, delay: float = 2.0) -> bool:
-    """Poll /health until API is up."""
+    """Poll /health until API is up.
+
+    Waits up to ``retries * delay`` seconds. Cheap TCP connect probes (with
+    exponential backoff capped at ``delay``) detect the moment the listener is
+    bound; only then is an HTTP /health request issued.
+    """
     try:
-        import urllib.request
-        url = f"http://localhost:{port}/health"
-        for attempt in range(retries):
-            try:
-                with urllib.request.urlopen(url, timeout=3) as resp:
-                    if resp.status == 200:
-                        return True
-            except Exception:
-                pass
-            if attempt < retries - 1:
-                time.sleep(delay)
-        return False
+        req = urllib.request.Request(f"http://localhost:{port}/health")
+        deadline = time.monotonic() + retries * delay
+        backoff = 0.05
+        while True:
+            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+                sock.settimeout(0.1)
+                bound = sock.connect_ex(("localhost", port)) == 0
+            if bound:
+                try:
+                    with urllib.request.urlopen(req, timeout=3) as resp:
+                        if resp.status == 200:
+                            return True
+                except Exception:
+                    pass
+            if time.monotonic() + backoff > deadline:
+                return False
+            time.sleep(backoff)
+            backoff = min(backoff * 1.5, delay)
     except Exception:
         return False
 
 
 # ─── Preflight checks ────────────────────────────────────────────────────────
 
+def _preflight_key() -> str:
+    """Fingerprint of the interpreter and its installed packages.
+
+    site-packages' mtime changes whenever a distribution is installed,
+    upgraded or removed, which invalidates a cached dependency check.
+    """
+    try:
+        site_mtime = os.stat(sysconfig.get_paths()["purelib"]).st_mtime
+    except OSError:
+        site_mtime = 0
+    raw = f"{sys.executable}|{sys.version_info}|{site_mtime}"
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def _deps_cached(key: str) -> bool:
+    try:
+        return json.loads(PREFLIGHT_CACHE.read_text()) == {"key": key, "deps_ok": True}
+    except (OSError, ValueError):
+        return False
+
+
 def run_preflight(demo: bool) -> bool:
     print(c(BOLD, "  Pre-flight checks"))
     print_separator()
@@ -153,26 +194,34 @@ def run_preflight(demo: bool) -> bool:
     else:
         print_step("🐍", f"Python {major}.{minor} (need 3.11+)", "warn")
 
-    # Key dependencies
-    deps = ["fastapi", "uvicorn", "httpx", "pydantic"]
-    missing = []
-    for dep in deps:
-        try:
-            __import__(dep)
+    # Key dependencies — importing them is slow, so skip it if this env already passed
+    key = _preflight_key()
+    if _deps_cached(key):
+        for dep in PREFLIGHT_DEPS:
             print_step("📦", dep, "ok")
-        except ImportError:
-            print_step("📦", dep + " — NOT INSTALLED", "fail")
-            missing.append(dep)
+    else:
+        missing = []
+        for dep in PREFLIGHT_DEPS:
+            try:
+                __import__(dep)
+                print_step("📦", dep, "ok")
+            except ImportError:
+                print_step("📦", dep + " — NOT INSTALLED", "fail")
+                missing.append(dep)
+
+        if missing:
+            print()
+            print(c(RED, f"  Missing: {', '.join(missing)}"))
+            print(c(DIM, "  Run: pip install -r requirements.txt"))
+            return False
 
-    if missing:
-        print()
-        print(c(RED, f"  Missing: {', '.join(missing)}"))
-        print(c(DIM, "  Run: pip install -r requirements.txt"))
-        return False
+        try:
+            PREFLIGHT_CACHE.write_text(json.dumps({"key": key, "deps_ok": True}))
+        except OSError:
+            pass
 
     # .env file
-    env_file = ROOT / ".env"
-    if env_file.exists():
+    if os.path.isfile(_ENV_PATH):
         print_step("🔑", ".env found", "ok")
     elif demo:
         print_step("🔑", ".env not found (OK in demo mode)", "skip")
@@ -185,9 +234,62 @@ def run_preflight(demo: bool) -> bool:
 
 # ─── Start API server ─────────────────────────────────────────────────────────
 
-def start_api(port: int, workers: int, env: dict) -> subprocess.Popen:
-    """Launch uvicorn API server."""
+class _ServerThread:
+    """Popen-like handle for a uvicorn server running on a thread of this process.
+
+    ``loop`` is the server's event loop (set once it runs). App state such as
+    the demo engine belongs to that loop, so work on it must be scheduled
+    there, not run from another thread or loop.
+    """
+
+    def __init__(self, server) -> None:
+        self._server = server
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        config = self._server.config
+        get_loop_factory = getattr(config, "get_loop_factory", None)  # uvicorn >= 0.36
+        if get_loop_factory is None:
+            config.setup_event_loop()  # Older uvicorn installs an event loop policy instead
+        with asyncio.Runner(loop_factory=get_loop_factory() if get_loop_factory else None) as runner:
+            self.loop = runner.get_loop()
+            runner.run(self._server.serve())
+
+    def terminate(self) -> None:
+        self._server.should_exit = True
+
+    def kill(self) -> None:
+        self._server.force_exit = True
+        self._server.should_exit = True
+
+    def wait(self, timeout: float | None = None) -> int:
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            raise subprocess.TimeoutExpired("uvicorn", timeout)
+        return 0
+
+
+def start_api(port: int, workers: int, env: dict) -> subprocess.Popen | _ServerThread:
+    """Launch uvicorn API server.
+
+    A single worker runs in-process on a background thread, reusing the
+    modules preflight already imported. Multi-worker runs need uvicorn's
+    process supervisor and are spawned as a child process.
+    """
     n_workers = workers if workers > 0 else (1 if env.get("DEMO_MODE") == "true" else 4)
+    if n_workers == 1:
+        import uvicorn
+
+        # The in-process API reads these at import and resolves its SQLite DB
+        # against the cwd, so (unlike the child process) this process must change
+        os.chdir(ROOT)
+        for key in ("DEMO_MODE", "LOG_LEVEL"):
+            os.environ[key] = env[key]
+        config = uvicorn.Config("v4.api.main:app", host="0.0.0.0", port=port, log_level="warning")
+        return _ServerThread(uvicorn.Server(config))
+
     cmd = [
         sys.executable, "-m", "uvicorn",
         "v4.api.main:app",
@@ -202,24 +304,80 @@ def start_api(port: int, workers: int, env: dict) -> subprocess.Popen:
 
 # ─── Post-startup actions ─────────────────────────────────────────────────────
 
+def _background_loop() -> asyncio.AbstractEventLoop:
+    """Event loop on a daemon thread that runs until exit.
+
+    Unlike asyncio.run, it doesn't cancel the jobs a scenario leaves simulating
+    once the scenario coroutine itself returns.
+    """
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return loop
+
+
+class _HeldLog:
+    """Log records a scenario emitted while running, printed once it is done."""
+
+    def __init__(self) -> None:
+        self.records: list[logging.LogRecord] = []
+        self.closed = False
+
+
+# Set per scenario task; tasks a scenario spawns inherit it and log live once it closes
+_held_log: contextvars.ContextVar[_HeldLog | None] = contextvars.ContextVar("held_log", default=None)
+
+
+class _HoldScenarioLogs(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        held = _held_log.get()
+        if held is None or held.closed:
+            return True
+        if not held.records or held.records[-1] is not record:  # Once across handlers
+            held.records.append(record)
+        return False
+
+
+async def _run_held(name: str, engine) -> dict:
+    """Run one scenario, then replay its log lines as a single block."""
+    from v4.demo.demo_scenario import run_scenario
+
+    held = _HeldLog()
+    _held_log.set(held)  # gather() runs each scenario in its own task and context
+    try:
+        return await run_scenario(name, engine)
+    finally:
+        held.closed = True
+        for record in held.records:
+            logging.getLogger(record.name).handle(record)
+
+
 async def post_start_demo_actions(port: int, scenario: str) -> None:
     """After API is up, kick off the demo scenario."""
     try:
         from v4.demo.demo_mode import get_demo_engine
-        from v4.demo.demo_scenario import run_scenario, run_all_scenarios
+        from v4.demo.demo_scenario import SCENARIOS
 
         engine = get_demo_engine()
-        await engine.start()
+        if not engine.is_active():  # An in-process API's lifespan has already started it
+            await engine.start()
 
         print()
         print(c(BOLD, "  Running demo scenario:"), c(CYAN, scenario))
         print_separator()
 
-        if scenario == "all":
-            results = await run_all_scenarios(engine)
-        else:
-            result = await run_scenario(scenario, engine)
-            results = [result]
+        # Scenarios overlap their waits; each one's log lines are held back
+        # and printed together when it finishes, so they don't interleave
+        hold = _HoldScenarioLogs()
+        for handler in logging.getLogger().handlers:
+            handler.addFilter(hold)
+        names = list(SCENARIOS) if scenario == "all" else [scenario]
+        outcomes = await asyncio.gather(
+            *(_run_held(name, engine) for name in names), return_exceptions=True
+        )
+        results = [
+            {"scenario": name, "error": repr(r)} if isinstance(r, BaseException) else r
+            for name, r in zip(names, outcomes)
+        ]
 
         for r in results:
             scen = r.get("scenario", "?")
@@ -285,8 +443,8 @@ def main() -> None:
     if not args.no_browser:
         url = f"http://localhost:{port}/demo" if demo else f"http://localhost:{port}/dashboard"
         print_step("🌍", f"Opening {url}...", "ok")
-        time.sleep(0.5)
-        webbrowser.open(url)
+        # Give the browser its head start off the main thread
+        threading.Timer(0.5, webbrowser.open, args=(url,)).start()
         print()
 
     # ── Demo scenarios ────────────────────────────────────────────────────────
@@ -294,7 +452,11 @@ def main() -> None:
         print(c(BOLD, "  Demo scenarios"))
         print_separator()
         print(c(DIM, "  Starting background scenario..."))
-        asyncio.run(post_start_demo_actions(port, args.scenario))
+        # Either way the banner and proc.wait() don't block on it. The in-process
+        # API owns the demo engine (its lifespan started it), so the scenario runs
+        # on the server's loop; a child-process API leaves us a local engine
+        loop = proc.loop if isinstance(proc, _ServerThread) else _background_loop()
+        asyncio.run_coroutine_threadsafe(post_start_demo_actions(port, args.scenario), loop)
 
     # ── Running banner ────────────────────────────────────────────────────────
     print()
@@ -1,17 +1,27 @@
-"""OrQuanta Agentic v1.0 — Agents Package."""
-from .master_orchestrator import MasterOrchestrator
-from .scheduler_agent import SchedulerAgent
-from .cost_optimizer_agent import CostOptimizerAgent
-from .healing_agent import HealingAgent
-from .audit_agent import AuditAgent, get_audit_agent
-from .recommendation_agent import RecommendationAgent
-from .forecast_agent import ForecastAgent
-from .memory_manager import MemoryManager
-from .tool_registry import ToolRegistry
-from .safety_governor import SafetyGovernor
-from .llm_reasoning_engine import LLMReasoningEngine
-from .orquanta_kernel_bridge import BomaxKernelBridge as OrQuantaKernelBridge
-BomaxKernelBridge = OrQuantaKernelBridge  # backward-compat alias
+"""OrQuanta Agentic v1.0 — Agents Package.
+
+Exports are resolved lazily (PEP 562): ``from v4.agents import AuditAgent``
+imports only ``audit_agent``, not the whole agent stack.
+"""
+import importlib
+
+# public name -> (submodule, attribute)
+_LAZY = {
+    "MasterOrchestrator":   ("master_orchestrator", "MasterOrchestrator"),
+    "SchedulerAgent":       ("scheduler_agent", "SchedulerAgent"),
+    "CostOptimizerAgent":   ("cost_optimizer_agent", "CostOptimizerAgent"),
+    "HealingAgent":         ("healing_agent", "HealingAgent"),
+    "AuditAgent":           ("audit_agent", "AuditAgent"),
+    "get_audit_agent":      ("audit_agent", "get_audit_agent"),
+    "RecommendationAgent":  ("recommendation_agent", "RecommendationAgent"),
+    "ForecastAgent":        ("forecast_agent", "ForecastAgent"),
+    "MemoryManager":        ("memory_manager", "MemoryManager"),
+    "ToolRegistry":         ("tool_registry", "ToolRegistry"),
+    "SafetyGovernor":       ("safety_governor", "SafetyGovernor"),
+    "LLMReasoningEngine":   ("llm_reasoning_engine", "LLMReasoningEngine"),
+    "OrQuantaKernelBridge": ("orquanta_kernel_bridge", "BomaxKernelBridge"),
+    "BomaxKernelBridge":    ("orquanta_kernel_bridge", "BomaxKernelBridge"),  # backward-compat alias
+}
 
 __all__ = [
     "MasterOrchestrator",
@@ -28,3 +38,17 @@ __all__ = [
     "OrQuantaKernelBridge",
     "BomaxKernelBridge",  # backward-compat
 ]
+
+
+def __getattr__(name: str):
+    try:
+        module, attr = _LAZY[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    value = getattr(importlib.import_module(f".{module}", __name__), attr)
+    globals()[name] = value  # Cache so later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -14,19 +14,58 @@ from __future__ import annotations
 import asyncio
 import logging
 import os
-from collections import defaultdict, deque
-from datetime import datetime, timezone
+import time
+from collections import defaultdict
 from typing import Any
 
+import numpy as np
+
 from .llm_reasoning_engine import LLMReasoningEngine
 from .memory_manager import MemoryManager
 from .safety_governor import get_governor
+from .smoothing import ewma
 from .tool_registry import ToolRegistry
 
 logger = logging.getLogger("orquanta.cost")
 
 PRICE_HISTORY_WINDOW = int(os.getenv("COST_PRICE_HISTORY_WINDOW", "100"))
 BUDGET_ALERT_THRESHOLD = float(os.getenv("COST_BUDGET_ALERT_PCT", "0.80"))
+EWMA_ALPHA = 0.3
+
+
+class PriceRing:
+    """Fixed-size ring buffer of spot price samples, stored column-wise.
+
+    Prices (float64) and unix-ns timestamps (int64) live in parallel NumPy
+    arrays so window statistics are single vectorized reductions.
+    """
+
+    __slots__ = ("prices", "ts_ns", "_head", "_count")
+
+    def __init__(self, size: int = PRICE_HISTORY_WINDOW) -> None:
+        self.prices = np.zeros(size, dtype=np.float64)
+        self.ts_ns = np.zeros(size, dtype=np.int64)
+        self._head = 0   # Next slot to write
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, price: float, ts_ns: int | None = None) -> None:
+        self.prices[self._head] = price
+        self.ts_ns[self._head] = time.time_ns() if ts_ns is None else ts_ns
+        self._head = (self._head + 1) % len(self.prices)
+        self._count = min(self._count + 1, len(self.prices))
+
+    def samples(self) -> np.ndarray:
+        """Filled slots in storage order — for order-independent stats."""
+        return self.prices[:self._count]
+
+    def ordered(self) -> np.ndarray:
+        """Prices oldest → newest."""
+        if self._count < len(self.prices):
+            return self.prices[:self._count]
+        return np.concatenate((self.prices[self._head:], self.prices[:self._head]))
 
 
 class CostOptimizerAgent:
@@ -54,16 +93,19 @@ class CostOptimizerAgent:
         print(from_spot["estimated_total_cost"])  # e.g., 15.56
     """
 
-    def __init__(self) -> None:
-        self.llm = LLMReasoningEngine()
-        self.memory = MemoryManager()
-        self.tools = ToolRegistry()
+    def __init__(
+        self,
+        llm: LLMReasoningEngine | None = None,
+        memory: MemoryManager | None = None,
+        tools: ToolRegistry | None = None,
+    ) -> None:
+        self.llm = llm or LLMReasoningEngine()
+        self.memory = memory or MemoryManager()
+        self.tools = tools or ToolRegistry()
         self.governor = get_governor()
 
-        # Price history: provider:gpu:region → deque of (timestamp, price)
-        self._price_history: dict[str, deque] = defaultdict(
-            lambda: deque(maxlen=PRICE_HISTORY_WINDOW)
-        )
+        # Price history: provider:gpu / avg:gpu → ring of (timestamp, price)
+        self._price_history: defaultdict[str, PriceRing] = defaultdict(PriceRing)
         # Budget tracking per job_id
         self._budgets: dict[str, dict[str, float]] = {}
         self._running = False
@@ -137,27 +179,32 @@ class CostOptimizerAgent:
             "budget_within_limit": (total <= budget_usd) if budget_usd else True,
         }
 
+        # Store in memory
+        writes = [self.memory.store_event({
+            "type": "cost_recommendation",
+            "gpu_type": gpu_type,
+            "required_hours": required_hours,
+            "recommended_provider": llm_result.get("recommended_provider"),
+            "estimated_hourly_cost": hourly,
+            "total_cost": total,
+            "budget_usd": budget_usd,
+        }, agent_name="cost_optimizer_agent")]
+
         # Warn if over budget
         if budget_usd and total > budget_usd:
-            await self.tools.send_alert(
+            writes.append(self.tools.send_alert(
                 message=(
                     f"⚠️ Cheapest option (${total:.2f}) exceeds budget of ${budget_usd:.2f} "
                     f"for {gpu_type} over {required_hours}h."
                 ),
                 severity="warning",
                 agent_name="cost_optimizer_agent",
-            )
+            ))
 
-        # Store in memory
-        await self.memory.store_event({
-            "type": "cost_recommendation",
-            "gpu_type": gpu_type,
-            "required_hours": required_hours,
-            "recommended_provider": llm_result.get("recommended_provider"),
-            "estimated_hourly_cost": hourly,
-            "total_cost": total,
-            "budget_usd": budget_usd,
-        }, agent_name="cost_optimizer_agent")
+        # Independent writes: overlap them rather than awaiting each in turn
+        for outcome in await asyncio.gather(*writes, return_exceptions=True):
+            if isinstance(outcome, Exception):
+                logger.warning("[CostOptimizer] Recommendation side effect failed: %s", outcome)
 
         return result
 
@@ -189,14 +236,8 @@ class CostOptimizerAgent:
         Returns:
             dict with base_estimate, smoothed_estimate, confidence_bounds.
         """
-        key = f"avg:{gpu_type}"
-        history = self._price_history.get(key, deque([hourly_rate]))
-
-        # Exponential smoothing: alpha=0.3
-        alpha = 0.3
-        smoothed = hourly_rate
-        for h_price in list(history):
-            smoothed = alpha * h_price + (1 - alpha) * smoothed
+        ring = self._price_history.get(f"avg:{gpu_type}")
+        smoothed = ewma(ring.ordered(), EWMA_ALPHA, hourly_rate) if ring else hourly_rate
 
         base_total = round(hourly_rate * duration_hours, 4)
         smoothed_total = round(smoothed * duration_hours, 4)
@@ -261,17 +302,16 @@ class CostOptimizerAgent:
         stats = []
         providers = ["aws", "gcp", "azure", "coreweave"]
         for provider in providers:
-            key = f"{provider}:{gpu_type}"
-            history = list(self._price_history.get(key, []))
-            if not history:
+            ring = self._price_history.get(f"{provider}:{gpu_type}")
+            if not ring:
                 continue
-            prices = [p for _, p in history]
+            prices = ring.samples()
             stats.append({
                 "provider": provider,
                 "gpu_type": gpu_type,
-                "avg_price_usd_hr": round(sum(prices) / len(prices), 4),
-                "min_price_usd_hr": round(min(prices), 4),
-                "max_price_usd_hr": round(max(prices), 4),
+                "avg_price_usd_hr": round(float(prices.mean()), 4),
+                "min_price_usd_hr": round(float(prices.min()), 4),
+                "max_price_usd_hr": round(float(prices.max()), 4),
                 "samples": len(prices),
             })
         return sorted(stats, key=lambda x: x["avg_price_usd_hr"])
@@ -298,20 +338,27 @@ class CostOptimizerAgent:
         PROVIDERS = ["aws", "gcp", "azure", "coreweave"]
         REGIONS = {"aws": "us-east-1", "gcp": "us-central1", "azure": "eastus", "coreweave": "us-east1"}
 
+        targets = [(provider, gpu) for gpu in GPU_TYPES for provider in PROVIDERS]
+
         while self._running:
-            for gpu in GPU_TYPES:
-                for provider in PROVIDERS:
-                    region = REGIONS.get(provider, "us-east-1")
-                    try:
-                        price_data = await self.tools.get_spot_prices(provider, region, gpu)
-                        current = price_data["current_price_usd_hr"]
-                        ts = datetime.now(timezone.utc).isoformat()
-
-                        # Store in history buckets
-                        self._price_history[f"{provider}:{gpu}"].append((ts, current))
-                        self._price_history[f"avg:{gpu}"].append((ts, current))
-
-                    except Exception as exc:
-                        logger.debug(f"[CostOptimizer] Price poll error {provider}/{gpu}: {exc}")
+            # One round-trip of latency per cycle instead of one per target
+            results = await asyncio.gather(
+                *(self.tools.get_spot_prices(provider, REGIONS.get(provider, "us-east-1"), gpu)
+                  for provider, gpu in targets),
+                return_exceptions=True,
+            )
+            ts = time.time_ns()
+            for (provider, gpu), price_data in zip(targets, results):
+                try:
+                    if isinstance(price_data, Exception):
+                        raise price_data
+                    current = price_data["current_price_usd_hr"]
+
+                    # Store in history buckets
+                    self._price_history[f"{provider}:{gpu}"].append(current, ts)
+                    self._price_history[f"avg:{gpu}"].append(current, ts)
+
+                except Exception as exc:
+                    logger.debug("[CostOptimizer] Price poll error %s/%s: %s", provider, gpu, exc)
 
             await asyncio.sleep(300)  # Poll every 5 minutes
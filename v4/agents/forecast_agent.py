@@ -15,18 +15,32 @@ import asyncio
 import logging
 import math
 import os
+import time
 from collections import defaultdict
+from collections.abc import Mapping
 from datetime import datetime, timezone
+from types import MappingProxyType
 from typing import Any
 
+import numpy as np
+
 from .llm_reasoning_engine import LLMReasoningEngine
 from .memory_manager import MemoryManager
+from .smoothing import ewma
 from .tool_registry import ToolRegistry
 
 logger = logging.getLogger("orquanta.forecast")
 
 FORECAST_INTERVAL = int(os.getenv("FORECAST_INTERVAL_HOURS", "6"))
 
+# GPU types the forecast reports on; they take codes 0..2 in the submission log,
+# and any other type is assigned the next code the first time it is seen
+_FORECAST_GPUS = ("H100", "A100", "T4")
+
+# Shared read-only default for GPU types with no hourly demand recorded
+_ZERO_HOURS = np.zeros(24, dtype=np.int32)
+_ZERO_HOURS.flags.writeable = False
+
 
 class ForecastAgent:
     """GPU demand forecasting agent using statistical models + LLM reasoning.
@@ -50,17 +64,30 @@ class ForecastAgent:
         print(report["predicted_gpu_demand"])
     """
 
-    def __init__(self) -> None:
-        self.llm = LLMReasoningEngine()
-        self.memory = MemoryManager()
-        self.tools = ToolRegistry()
-
-        # Job submission history: list of (timestamp_epoch, gpu_type)
-        self._job_history: list[tuple[float, str]] = []
+    def __init__(
+        self,
+        llm: LLMReasoningEngine | None = None,
+        memory: MemoryManager | None = None,
+        tools: ToolRegistry | None = None,
+    ) -> None:
+        self.llm = llm or LLMReasoningEngine()
+        self.memory = memory or MemoryManager()
+        self.tools = tools or ToolRegistry()
+
+        # Job submission history, column-wise: epoch seconds + GPU code per job.
+        # Capacity doubles when full; the first _n slots are live.
+        self._ts_buf = np.empty(1024, dtype=np.float64)
+        self._gpu_buf = np.empty(1024, dtype=np.uint16)
+        self._n = 0
+        self._gpu_names: list[str] = list(_FORECAST_GPUS)  # Code → GPU type
+        self._gpu_codes = {gpu: code for code, gpu in enumerate(self._gpu_names)}
         # GPU type demand counters per hour-of-day (0-23)
-        self._hourly_demand: dict[str, list[int]] = defaultdict(lambda: [0] * 24)
+        self._hourly_demand: dict[str, np.ndarray] = defaultdict(
+            lambda: np.zeros(24, dtype=np.int32)
+        )
         # Current running utilization
         self._current_utilization: dict[str, int] = {"H100": 0, "A100": 0, "T4": 0}
+        self._total_active = 0  # sum(_current_utilization.values()), kept incrementally
         self._running = False
         self._last_forecast: dict[str, Any] = {}
         logger.info("ForecastAgent initialised.")
@@ -69,7 +96,7 @@ class ForecastAgent:
         """Start background forecasting loop."""
         self._running = True
         asyncio.create_task(self._forecast_loop())
-        logger.info(f"ForecastAgent running (interval={FORECAST_INTERVAL}h).")
+        logger.info("ForecastAgent running (interval=%sh).", FORECAST_INTERVAL)
 
     async def stop(self) -> None:
         self._running = False
@@ -80,18 +107,24 @@ class ForecastAgent:
 
     def record_job_submission(self, gpu_type: str) -> None:
         """Record a job submission for demand forecasting."""
-        now = datetime.now(timezone.utc)
-        self._job_history.append((now.timestamp(), gpu_type))
-        hour = now.hour
+        now = time.time()
+        code = self._gpu_codes.get(gpu_type)
+        if code is None:
+            code = self._gpu_codes[gpu_type] = len(self._gpu_names)
+            self._gpu_names.append(gpu_type)
+        self._append(now, code)
+        hour = int(now // 3600) % 24  # UTC hour of day
         if gpu_type in self._hourly_demand:
             self._hourly_demand[gpu_type][hour] += 1
         self._current_utilization[gpu_type] = self._current_utilization.get(gpu_type, 0) + 1
+        self._total_active += 1
 
     def record_job_completion(self, gpu_type: str) -> None:
         """Record a job completion (decrements active count)."""
-        self._current_utilization[gpu_type] = max(
-            0, self._current_utilization.get(gpu_type, 0) - 1
-        )
+        count = self._current_utilization.get(gpu_type, 0)
+        if count > 0:
+            self._total_active -= 1
+        self._current_utilization[gpu_type] = max(0, count - 1)
 
     async def run_forecast(self, window_hours: int = 24) -> dict[str, Any]:
         """Run a full demand forecast for the next time window.
@@ -106,23 +139,24 @@ class ForecastAgent:
             dict with predicted_job_count, predicted_gpu_demand,
             confidence_interval, recommendation, reasoning.
         """
-        logger.info(f"[Forecast] Running {window_hours}h demand forecast.")
+        logger.info("[Forecast] Running %sh demand forecast.", window_hours)
 
         # Build history summary for LLM
         history_summary = self._build_history_summary()
         utilization = self._current_utilization.copy()
 
-        # Statistical forecast
-        stat_forecast = self._statistical_forecast(window_hours)
-
-        # LLM-enhanced reasoning over statistical output
-        llm_result = await self.llm.reason(
-            template_name="forecast_analyze",
-            variables={
-                "history": history_summary,
-                "utilization": utilization,
-            },
-            agent_name="forecast_agent",
+        # Statistical forecast (worker thread) and LLM reasoning over the same
+        # history are independent, so the NumPy work overlaps the LLM round-trip
+        stat_forecast, llm_result = await asyncio.gather(
+            asyncio.to_thread(self._statistical_forecast, window_hours),
+            self.llm.reason(
+                template_name="forecast_analyze",
+                variables={
+                    "history": history_summary,
+                    "utilization": utilization,
+                },
+                agent_name="forecast_agent",
+            ),
         )
 
         # Merge statistical and LLM forecasts
@@ -146,7 +180,7 @@ class ForecastAgent:
             "recommendation": llm_result.get("recommendation", stat_forecast["recommendation"]),
             "reasoning": llm_result.get("reasoning", "Statistical-only forecast."),
             "statistical_model": "exponential_smoothing_holt_winters",
-            "history_jobs_analyzed": len(self._job_history),
+            "history_jobs_analyzed": self._n,
             "generated_at": datetime.now(timezone.utc).isoformat(),
         }
 
@@ -161,33 +195,33 @@ class ForecastAgent:
         }, agent_name="forecast_agent")
 
         logger.info(
-            f"[Forecast] Done: {result['predicted_job_count']} jobs predicted, "
-            f"recommendation='{result['recommendation']}'"
+            "[Forecast] Done: %s jobs predicted, recommendation='%s'",
+            result["predicted_job_count"], result["recommendation"],
         )
 
         return result
 
-    def get_last_forecast(self) -> dict[str, Any]:
-        """Return the most recent forecast without re-running."""
-        return self._last_forecast or {"status": "no_forecast_yet"}
+    def get_last_forecast(self) -> Mapping[str, Any]:
+        """Return a read-only view of the most recent forecast without re-running."""
+        return MappingProxyType(self._last_forecast or {"status": "no_forecast_yet"})
 
     def get_utilization(self) -> dict[str, Any]:
-        """Return current GPU utilization counts."""
+        """Return current GPU utilization counts (a point-in-time copy)."""
         return {
-            "active_jobs_by_gpu": self._current_utilization.copy(),
-            "total_active_jobs": sum(self._current_utilization.values()),
-            "recorded_job_history": len(self._job_history),
+            "active_jobs_by_gpu": dict(self._current_utilization),
+            "total_active_jobs": self._total_active,
+            "recorded_job_history": self._n,
         }
 
     def get_hourly_demand_chart(self, gpu_type: str = "H100") -> dict[str, Any]:
         """Return hourly demand distribution (0-23) for a GPU type."""
-        demand = self._hourly_demand.get(gpu_type, [0] * 24)
-        peak_hour = demand.index(max(demand)) if any(demand) else 0
+        demand = self._hourly_demand.get(gpu_type, _ZERO_HOURS)
+        peak_hour = int(demand.argmax())  # First peak; 0 when there is no demand
         return {
             "gpu_type": gpu_type,
-            "hourly_demand": demand,
+            "hourly_demand": demand.tolist(),
             "peak_hour_utc": peak_hour,
-            "peak_count": max(demand),
+            "peak_count": int(demand[peak_hour]),
         }
 
     # ------------------------------------------------------------------
@@ -205,12 +239,14 @@ class ForecastAgent:
         Returns:
             dict with predicted_jobs, per_gpu counts, confidence_low/high, recommendation.
         """
-        if not self._job_history:
+        n = self._n  # Snapshot: submissions may be appended while this runs off-loop
+        if not n:
             return self._empty_forecast()
 
-        # Compute jobs per hour over the last 7 days
-        now = datetime.now(timezone.utc).timestamp()
-        recent = [ts for ts, _ in self._job_history if now - ts < 7 * 86400]
+        # Compute jobs per hour over the last 7 days (timestamps are ascending)
+        now = time.time()
+        ts = self._ts_buf[:n]
+        recent = ts[np.searchsorted(ts, now - 7 * 86400, side="right"):]
 
         if len(recent) < 2:
             return self._empty_forecast()
@@ -219,25 +255,24 @@ class ForecastAgent:
         elapsed_hours = max((now - recent[0]) / 3600, 1.0)
         jobs_per_hour = len(recent) / elapsed_hours
 
+        # Jobs in the hour up to each of the first (up to 19) recent submissions, +1
+        probes = recent[1:20]
+        prev_rates = (
+            np.searchsorted(recent, probes, side="right")
+            - np.searchsorted(recent, probes - 3600, side="left")
+            + 1
+        )
+
         # Simple exponential smoothing (alpha=0.3)
-        alpha = 0.3
-        smoothed_rate = jobs_per_hour
-        for i in range(1, min(len(recent), 20)):
-            prev_rate = (
-                len([t for t in recent if recent[i] - 3600 <= t <= recent[i]]) + 1
-            )
-            smoothed_rate = alpha * prev_rate + (1 - alpha) * smoothed_rate
+        smoothed_rate = ewma(prev_rates, 0.3, jobs_per_hour)
 
         predicted_jobs = max(1, round(smoothed_rate * window_hours))
 
         # GPU type distribution from history
-        gpu_counts: dict[str, int] = {"H100": 0, "A100": 0, "T4": 0}
-        for _, gpu in self._job_history:
-            if gpu in gpu_counts:
-                gpu_counts[gpu] += 1
-        total = sum(gpu_counts.values()) or 1
-        per_gpu = {gpu: max(1, round(predicted_jobs * cnt / total))
-                   for gpu, cnt in gpu_counts.items()}
+        k = len(_FORECAST_GPUS)
+        counts = np.bincount(self._gpu_buf[:n], minlength=k)[:k]
+        shares = np.maximum(1, np.round(predicted_jobs * counts / max(int(counts.sum()), 1)))
+        per_gpu = dict(zip(_FORECAST_GPUS, shares.astype(np.int64).tolist()))
 
         # Confidence interval: ±20%
         std_dev = smoothed_rate * 0.2
@@ -246,7 +281,7 @@ class ForecastAgent:
 
         # Recommendation heuristic
         total_demand = sum(per_gpu.values())
-        active = sum(self._current_utilization.values())
+        active = self._total_active  # Single int read; safe off-loop
         headroom = total_demand - active
         if headroom > 5:
             recommendation = "pre-provision"
@@ -264,6 +299,15 @@ class ForecastAgent:
             "recommendation": recommendation,
         }
 
+    def _append(self, ts: float, gpu_code: int) -> None:
+        """Append one submission to the column buffers, doubling them when full."""
+        if self._n == len(self._ts_buf):
+            self._ts_buf = np.concatenate((self._ts_buf, np.empty_like(self._ts_buf)))
+            self._gpu_buf = np.concatenate((self._gpu_buf, np.empty_like(self._gpu_buf)))
+        self._ts_buf[self._n] = ts
+        self._gpu_buf[self._n] = gpu_code
+        self._n += 1
+
     def _empty_forecast(self) -> dict[str, Any]:
         """Return a zero forecast when no history is available."""
         return {
@@ -277,19 +321,16 @@ class ForecastAgent:
 
     def _build_history_summary(self) -> dict[str, Any]:
         """Build a compact summary of job history for LLM context."""
-        recent_24h = [
-            gpu for ts, gpu in self._job_history
-            if (datetime.now(timezone.utc).timestamp() - ts) < 86400
-        ]
-        counts_24h: dict[str, int] = {}
-        for gpu in recent_24h:
-            counts_24h[gpu] = counts_24h.get(gpu, 0) + 1
+        now_ts = time.time()
+        start = int(np.searchsorted(self._ts_buf[:self._n], now_ts - 86400, side="right"))
+        counts = np.bincount(self._gpu_buf[start:self._n])
+        counts_24h = {self._gpu_names[code]: n for code, n in enumerate(counts.tolist()) if n}
 
         return {
-            "total_jobs_recorded": len(self._job_history),
-            "jobs_last_24h": len(recent_24h),
+            "total_jobs_recorded": self._n,
+            "jobs_last_24h": self._n - start,
             "gpu_breakdown_24h": counts_24h,
-            "hourly_demand_h100": self._hourly_demand.get("H100", [0] * 24),
+            "hourly_demand_h100": self._hourly_demand.get("H100", _ZERO_HOURS).tolist(),
         }
 
     # ------------------------------------------------------------------
@@ -303,4 +344,4 @@ class ForecastAgent:
             try:
                 await self.run_forecast(window_hours=24)
             except Exception as exc:
-                logger.error(f"[Forecast] Periodic forecast failed: {exc}")
+                logger.error("[Forecast] Periodic forecast failed: %s", exc)
@@ -15,10 +15,13 @@ import asyncio
 import logging
 import math
 import os
+import time
 from collections import defaultdict, deque
 from datetime import datetime, timezone
 from typing import Any
 
+import numpy as np
+
 from .llm_reasoning_engine import LLMReasoningEngine
 from .memory_manager import MemoryManager
 from .safety_governor import get_governor
@@ -29,7 +32,42 @@ logger = logging.getLogger("orquanta.healing")
 MONITOR_INTERVAL = float(os.getenv("HEALER_MONITOR_INTERVAL_S", "10.0"))
 OOM_MEMORY_THRESHOLD_PCT = float(os.getenv("HEALER_OOM_THRESHOLD_PCT", "97.0"))
 ANOMALY_ZSCORE_THRESHOLD = float(os.getenv("HEALER_ZSCORE_THRESHOLD", "3.0"))
+_ZSCORE_THRESHOLD_SQ = ANOMALY_ZSCORE_THRESHOLD ** 2  # Compare squared: no division per check
 MAX_RESTART_ATTEMPTS = int(os.getenv("HEALER_MAX_RESTARTS", "3"))
+MAX_PARALLEL_CHECKS = int(os.getenv("HEALER_MAX_PARALLEL_CHECKS", "32"))  # Metrics API rate limit
+MAX_HEAL_HISTORY = int(os.getenv("HEALER_HEAL_HISTORY_MAX", "1024"))
+
+HISTORY_WINDOW = 60  # Snapshots kept per job: ~10 min at 10s interval
+
+# Numeric telemetry fields kept in each job's history (one buffer column each);
+# the first three also get incrementally maintained rolling mean/std
+METRIC_FIELDS = (
+    "gpu_utilization_pct", "memory_utilization_pct", "temp_celsius",
+    "memory_used_gb", "power_watts",
+)
+TRACKED_FIELDS = METRIC_FIELDS[:3]
+_FIELD_INDEX = {field: i for i, field in enumerate(METRIC_FIELDS)}
+
+# History is stored as uint32 fixed point at each field's reported precision:
+# tenths, except hundredths for memory_used_gb (get_gpu_metrics rounds it to 2
+# decimals). 0xFFFFFFFF marks a missing field
+_QUANT_SCALE = np.array([100.0 if f == "memory_used_gb" else 10.0 for f in METRIC_FIELDS])
+_QUANT_MAX = 0xFFFFFFFE
+_MISSING = 0xFFFFFFFF
+
+
+def _quantize(values: np.ndarray) -> np.ndarray:
+    scaled = np.rint(values * _QUANT_SCALE)
+    missing = np.isnan(scaled)
+    np.clip(scaled, 0, _QUANT_MAX, out=scaled)
+    scaled[missing] = _MISSING
+    return scaled.astype(np.uint32)
+
+
+def _dequantize(stored: np.ndarray) -> np.ndarray:
+    values = stored / _QUANT_SCALE
+    values[stored == _MISSING] = np.nan
+    return values
 
 
 class JobHealthRecord:
@@ -40,27 +78,89 @@ class JobHealthRecord:
         self.instance_id = instance_id
         self.restart_count = 0
         self.anomaly_count = 0
-        self.metrics_history: deque = deque(maxlen=60)  # ~10 min at 10s interval
+        # Ring buffer of snapshots: row per snapshot, column per METRIC_FIELDS
+        # entry (quantized, see _quantize), plus the epoch time of each row
+        self._buf = np.full((HISTORY_WINDOW, len(METRIC_FIELDS)), _MISSING, dtype=np.uint32)
+        self._ts = np.zeros(HISTORY_WINDOW, dtype=np.float64)
+        self._head = 0  # Next row to write
+        self._size = 0
+        # Welford running [n, mean, M2] per tracked field over the buffer
+        self._running_stats: dict[str, list[float]] = {f: [0, 0.0, 0.0] for f in TRACKED_FIELDS}
         self.status = "healthy"
         self.flags: list[str] = []
         self.last_healed_at: str | None = None
 
     def record_metrics(self, metrics: dict[str, Any]) -> None:
         """Add a new metrics snapshot to the rolling window."""
-        self.metrics_history.append({
-            **metrics,
-            "ts": datetime.now(timezone.utc).isoformat(),
-        })
+        row = _quantize(np.array([metrics.get(f, np.nan) for f in METRIC_FIELDS], dtype=np.float64))
+        # Running stats see the stored (quantized) values so evictions cancel exactly
+        if self._size == HISTORY_WINDOW:
+            evicted = _dequantize(self._buf[self._head]).tolist()  # About to be overwritten
+            for field, acc in self._running_stats.items():
+                x = evicted[_FIELD_INDEX[field]]
+                if not math.isnan(x):
+                    self._welford_remove(acc, x)
+        values = _dequantize(row).tolist()
+        for field, acc in self._running_stats.items():
+            x = values[_FIELD_INDEX[field]]
+            if not math.isnan(x):
+                self._welford_add(acc, x)
+
+        self._buf[self._head] = row
+        self._ts[self._head] = time.time()
+        self._head = (self._head + 1) % HISTORY_WINDOW
+        self._size = min(self._size + 1, HISTORY_WINDOW)
+
+    @property
+    def snapshot_count(self) -> int:
+        return self._size
+
+    def snapshots(self) -> list[dict[str, Any]]:
+        """History as dicts, oldest first, with ISO ``ts`` (built on demand)."""
+        rows = (self._head - self._size + np.arange(self._size)) % HISTORY_WINDOW
+        values = _dequantize(self._buf[rows]).tolist()
+        return [
+            {
+                **{f: v for f, v in zip(METRIC_FIELDS, row) if not math.isnan(v)},
+                "ts": datetime.fromtimestamp(ts, tz=timezone.utc).isoformat(),
+            }
+            for row, ts in zip(values, self._ts[rows].tolist())
+        ]
+
+    @staticmethod
+    def _welford_add(acc: list[float], x: float) -> None:
+        acc[0] += 1
+        delta = x - acc[1]
+        acc[1] += delta / acc[0]
+        acc[2] += delta * (x - acc[1])
+
+    @staticmethod
+    def _welford_remove(acc: list[float], x: float) -> None:
+        n = acc[0] - 1
+        if n <= 0:
+            acc[:] = [0, 0.0, 0.0]
+            return
+        mean = (acc[0] * acc[1] - x) / n
+        acc[2] = max(acc[2] - (x - acc[1]) * (x - mean), 0.0)
+        acc[0], acc[1] = n, mean
 
     def get_rolling_stats(self, field: str) -> dict[str, float]:
         """Compute mean and std-dev for a metric field over the history window."""
-        values = [m[field] for m in self.metrics_history if field in m]
-        if not values:
+        acc = self._running_stats.get(field)
+        if acc is not None and acc[0] >= 2:
+            n, mean, m2 = acc
+            return {"mean": mean, "std": math.sqrt(m2 / (n - 1)), "n": n}
+        idx = _FIELD_INDEX.get(field)
+        if idx is None:
+            return {"mean": 0.0, "std": 0.0, "n": 0}
+        col = self._buf[:self._size, idx]  # Row order is irrelevant for these stats
+        col = col[col != _MISSING] / _QUANT_SCALE[idx]
+        n = int(col.size)
+        if not n:
             return {"mean": 0.0, "std": 0.0, "n": 0}
-        n = len(values)
-        mean = sum(values) / n
-        variance = sum((v - mean) ** 2 for v in values) / max(n - 1, 1)
-        return {"mean": mean, "std": math.sqrt(variance), "n": n}
+        mean = float(col.mean())
+        std = float(col.std(ddof=1)) if n > 1 else 0.0
+        return {"mean": mean, "std": std, "n": n}
 
 
 class HealingAgent:
@@ -89,22 +189,28 @@ class HealingAgent:
         status = healer.get_health_status("job-abc123")
     """
 
-    def __init__(self) -> None:
-        self.llm = LLMReasoningEngine()
-        self.memory = MemoryManager()
-        self.tools = ToolRegistry()
+    def __init__(
+        self,
+        llm: LLMReasoningEngine | None = None,
+        memory: MemoryManager | None = None,
+        tools: ToolRegistry | None = None,
+    ) -> None:
+        self.llm = llm or LLMReasoningEngine()
+        self.memory = memory or MemoryManager()
+        self.tools = tools or ToolRegistry()
         self.governor = get_governor()
 
         self._monitored: dict[str, JobHealthRecord] = {}
+        self._check_slots = asyncio.Semaphore(MAX_PARALLEL_CHECKS)
         self._running = False
-        self._healed_jobs: list[dict[str, Any]] = []
+        self._healed_jobs: deque[dict[str, Any]] = deque(maxlen=MAX_HEAL_HISTORY)
         logger.info("HealingAgent initialised.")
 
     async def start(self) -> None:
         """Start the background health monitoring loop."""
         self._running = True
         asyncio.create_task(self._monitoring_loop())
-        logger.info(f"HealingAgent monitoring loop active (interval={MONITOR_INTERVAL}s).")
+        logger.info("HealingAgent monitoring loop active (interval=%ss).", MONITOR_INTERVAL)
 
     async def stop(self) -> None:
         self._running = False
@@ -130,7 +236,7 @@ class HealingAgent:
 
         record = JobHealthRecord(job_id=job_id, instance_id=instance_id)
         self._monitored[job_id] = record
-        logger.info(f"[Healer] Started monitoring {job_id} on {instance_id}.")
+        logger.info("[Healer] Started monitoring %s on %s.", job_id, instance_id)
 
         return {
             "status": "monitoring_started",
@@ -142,7 +248,7 @@ class HealingAgent:
     def stop_monitoring(self, job_id: str) -> None:
         """Stop monitoring a completed or cancelled job."""
         self._monitored.pop(job_id, None)
-        logger.info(f"[Healer] Stopped monitoring {job_id}.")
+        logger.info("[Healer] Stopped monitoring %s.", job_id)
 
     def get_health_status(self, job_id: str) -> dict[str, Any] | None:
         """Return health status for a specific job."""
@@ -156,7 +262,7 @@ class HealingAgent:
             "restart_count": record.restart_count,
             "anomaly_count": record.anomaly_count,
             "flags": record.flags,
-            "snapshot_count": len(record.metrics_history),
+            "snapshot_count": record.snapshot_count,
             "last_healed_at": record.last_healed_at,
         }
 
@@ -168,7 +274,10 @@ class HealingAgent:
         ]
 
     def get_heal_history(self) -> list[dict[str, Any]]:
-        """Return history of all autonomous healing actions taken."""
+        """Return recent autonomous healing actions, newest first.
+
+        Only the last MAX_HEAL_HISTORY (HEALER_HEAL_HISTORY_MAX) actions are kept.
+        """
         return list(reversed(self._healed_jobs))
 
     # ------------------------------------------------------------------
@@ -178,23 +287,56 @@ class HealingAgent:
     async def _monitoring_loop(self) -> None:
         """Collect metrics and run anomaly detection for all monitored jobs."""
         while self._running:
-            jobs = list(self._monitored.keys())
-            for job_id in jobs:
-                record = self._monitored.get(job_id)
-                if not record:
-                    continue
-                try:
-                    await self._check_job(record)
-                except Exception as exc:
-                    logger.error(f"[Healer] Monitor error for {job_id}: {exc}")
-
-            await asyncio.sleep(MONITOR_INTERVAL)
-
-    async def _check_job(self, record: JobHealthRecord) -> None:
-        """Run a full health check cycle for one job."""
-        metrics = await self.tools.get_gpu_metrics(record.instance_id)
+            tick = time.monotonic()
+            # One metrics round per tick for all instances (at most
+            # MAX_PARALLEL_CHECKS calls in flight), then the per-job checks run
+            # concurrently (bounded by _check_slots) over that snapshot
+            records = list(self._monitored.values())
+            try:
+                metrics_map = await self.tools.get_gpu_metrics_many(
+                    [record.instance_id for record in records],
+                    max_concurrent=MAX_PARALLEL_CHECKS,
+                )
+            except Exception as exc:
+                logger.error("[Healer] Metrics round failed: %s", exc)
+            else:
+                now_iso = datetime.now(timezone.utc).isoformat()  # Shared tick timestamp
+                results = await asyncio.gather(
+                    *(self._bounded_check(record, metrics_map[record.instance_id], now_iso)
+                      for record in records),
+                    return_exceptions=True,
+                )
+                for record, outcome in zip(records, results):
+                    if isinstance(outcome, Exception):
+                        logger.error("[Healer] Monitor error for %s: %s", record.job_id, outcome)
+
+            # Sleep to the next tick boundary so the check fan-out doesn't stretch the period
+            await asyncio.sleep(max(0.0, tick + MONITOR_INTERVAL - time.monotonic()))
+
+    async def _bounded_check(
+        self, record: JobHealthRecord, metrics: dict[str, Any], now_iso: str
+    ) -> None:
+        async with self._check_slots:
+            # Skip jobs whose monitoring stopped while this check was queued
+            if self._monitored.get(record.job_id) is record:
+                await self._check_job(record, metrics, now_iso)
+
+    async def _check_job(
+        self,
+        record: JobHealthRecord,
+        metrics: dict[str, Any] | None = None,
+        now_iso: str | None = None,
+    ) -> None:
+        """Run a full health check cycle for one job (fetching metrics unless given).
+
+        ``now_iso`` stamps any healing actions; the monitoring loop passes one
+        timestamp per tick.
+        """
+        if metrics is None:
+            metrics = await self.tools.get_gpu_metrics(record.instance_id)
+        now_iso = now_iso or datetime.now(timezone.utc).isoformat()
         if "error" in metrics:
-            logger.warning(f"[Healer] Can't get metrics for {record.job_id}: {metrics['error']}")
+            logger.warning("[Healer] Can't get metrics for %s: %s", record.job_id, metrics["error"])
             return
 
         record.record_metrics(metrics)
@@ -204,25 +346,26 @@ class HealingAgent:
         if mem_pct >= OOM_MEMORY_THRESHOLD_PCT:
             if "oom_risk" not in record.flags:
                 record.flags.append("oom_risk")
-                await self._heal_oom(record, metrics)
+                await self._heal_oom(record, metrics, now_iso)
             return
 
         # --- Rule 2: Thermal throttling detection ---
         temp = metrics.get("temp_celsius", 0.0)
         if temp > 84.0 and "thermal" not in record.flags:
             record.flags.append("thermal")
-            await self._heal_thermal(record, metrics)
+            await self._heal_thermal(record, metrics, now_iso)
 
         # --- Rule 3: Statistical anomaly detection (Z-score on GPU utilization) ---
         stats = record.get_rolling_stats("gpu_utilization_pct")
-        if stats["n"] >= 10 and stats["std"] > 0:
-            util = metrics.get("gpu_utilization_pct", 0.0)
-            z_score = abs(util - stats["mean"]) / stats["std"]
-            if z_score > ANOMALY_ZSCORE_THRESHOLD:
+        std = stats["std"]
+        if stats["n"] >= 10 and std > 0:
+            # |util - mean| / std > threshold, without the divide
+            delta = metrics.get("gpu_utilization_pct", 0.0) - stats["mean"]
+            if delta * delta > _ZSCORE_THRESHOLD_SQ * std * std:
                 record.anomaly_count += 1
                 if record.anomaly_count >= 3 and "repeated_anomaly" not in record.flags:
                     record.flags.append("repeated_anomaly")
-                    await self._heal_anomaly(record, metrics, z_score)
+                    await self._heal_anomaly(record, metrics, abs(delta) / std, now_iso)
 
         # Mark healthy if no flags remain
         if not record.flags:
@@ -232,9 +375,12 @@ class HealingAgent:
     # Healing Playbooks
     # ------------------------------------------------------------------
 
-    async def _heal_oom(self, record: JobHealthRecord, metrics: dict) -> None:
+    async def _heal_oom(self, record: JobHealthRecord, metrics: dict, now_iso: str) -> None:
         """Healing playbook: OOM risk — diagnose with LLM, then scale up GPU."""
-        logger.warning(f"[Healer] OOM risk detected for {record.job_id} ({metrics.get('memory_utilization_pct', 0):.1f}% mem)")
+        logger.warning(
+            "[Healer] OOM risk detected for %s (%.1f%% mem)",
+            record.job_id, metrics.get("memory_utilization_pct", 0),
+        )
         record.status = "healing"
 
         # LLM diagnosis
@@ -252,8 +398,8 @@ class HealingAgent:
         confidence = diagnosis.get("confidence", 0.80)
 
         logger.info(
-            f"[Healer] OOM diagnosis for {record.job_id}: {diagnosis.get('diagnosis', 'N/A')} "
-            f"→ action={action} (confidence={confidence:.0%})"
+            "[Healer] OOM diagnosis for %s: %s → action=%s (confidence=%.0f%%)",
+            record.job_id, diagnosis.get("diagnosis", "N/A"), action, confidence * 100,
         )
 
         heal_record = {
@@ -262,7 +408,7 @@ class HealingAgent:
             "action": action,
             "reasoning": diagnosis.get("reasoning", ""),
             "confidence": confidence,
-            "healed_at": datetime.now(timezone.utc).isoformat(),
+            "healed_at": now_iso,
         }
 
         if action == "scale_up":
@@ -287,9 +433,11 @@ class HealingAgent:
             "action": action,
         }, agent_name="healing_agent")
 
-    async def _heal_thermal(self, record: JobHealthRecord, metrics: dict) -> None:
+    async def _heal_thermal(self, record: JobHealthRecord, metrics: dict, now_iso: str) -> None:
         """Healing playbook: thermal throttling — send alert, suggest batch reduction."""
-        logger.warning(f"[Healer] Thermal throttle on {record.job_id}: {metrics.get('temp_celsius', 0)}°C")
+        logger.warning(
+            "[Healer] Thermal throttle on %s: %s°C", record.job_id, metrics.get("temp_celsius", 0)
+        )
         record.status = "degraded"
 
         await self.tools.send_alert(
@@ -307,15 +455,17 @@ class HealingAgent:
             "trigger": "thermal_throttle",
             "action": "alert_issued",
             "temp_celsius": metrics.get("temp_celsius"),
-            "healed_at": datetime.now(timezone.utc).isoformat(),
+            "healed_at": now_iso,
         })
-        record.last_healed_at = datetime.now(timezone.utc).isoformat()
+        record.last_healed_at = now_iso
 
-    async def _heal_anomaly(self, record: JobHealthRecord, metrics: dict, z_score: float) -> None:
+    async def _heal_anomaly(
+        self, record: JobHealthRecord, metrics: dict, z_score: float, now_iso: str
+    ) -> None:
         """Healing playbook: persistent statistical anomaly — restart job."""
         logger.warning(
-            f"[Healer] Persistent anomaly on {record.job_id}: "
-            f"z-score={z_score:.2f}, restarts={record.restart_count}/{MAX_RESTART_ATTEMPTS}"
+            "[Healer] Persistent anomaly on %s: z-score=%.2f, restarts=%d/%d",
+            record.job_id, z_score, record.restart_count, MAX_RESTART_ATTEMPTS,
         )
 
         if record.restart_count >= MAX_RESTART_ATTEMPTS:
@@ -337,13 +487,13 @@ class HealingAgent:
         backoff_delay = 5 * (2 ** record.restart_count)  # Exponential backoff: 10, 20, 40s
 
         logger.info(
-            f"[Healer] Scheduling restart #{record.restart_count} for {record.job_id} "
-            f"in {backoff_delay}s (backoff)."
+            "[Healer] Scheduling restart #%d for %s in %ss (backoff).",
+            record.restart_count, record.job_id, backoff_delay,
         )
 
         async def _delayed_restart():
             await asyncio.sleep(backoff_delay)
-            logger.info(f"[Healer] Restarting {record.job_id} (attempt #{record.restart_count}).")
+            logger.info("[Healer] Restarting %s (attempt #%d).", record.job_id, record.restart_count)
             record.flags = []
             record.status = "restarting"
 
@@ -356,6 +506,6 @@ class HealingAgent:
             "z_score": round(z_score, 2),
             "restart_number": record.restart_count,
             "backoff_delay_s": backoff_delay,
-            "healed_at": datetime.now(timezone.utc).isoformat(),
+            "healed_at": now_iso,
         })
-        record.last_healed_at = datetime.now(timezone.utc).isoformat()
+        record.last_healed_at = now_iso
@@ -8,18 +8,60 @@ parsing, and fallback logic when primary LLM fails.
 
 from __future__ import annotations
 
+import asyncio
+import functools
+import hashlib
+import importlib.util
 import json
 import logging
 import os
+import random
 import time
+from collections import OrderedDict
+from collections.abc import Mapping
+from copy import deepcopy
 from enum import Enum
 from string import Template
-from typing import Any
+from types import MappingProxyType
+from typing import Any, Awaitable, Callable, Literal, Protocol, get_args
 
-from pydantic import BaseModel, Field
+import numpy as np
+from pydantic import BaseModel, Field, ValidationError
 
 logger = logging.getLogger("orquanta.llm")
 
+# Non-string keys (e.g. int hour buckets) are stringified as json.dumps would
+try:  # Optional: prompts and cache keys only need valid JSON, not identical bytes
+    import orjson
+
+    def _dumps(obj: Any, sort_keys: bool = False, indent: bool = False, default=None) -> bytes:
+        option = orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=default, option=option)
+
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj: Any, sort_keys: bool = False, indent: bool = False, default=None) -> bytes:
+        return json.dumps(
+            obj, sort_keys=sort_keys, indent=2 if indent else None, default=default,
+            separators=None if indent else (",", ":"), ensure_ascii=False,
+        ).encode()
+
+    _loads = json.loads
+
+# Process-wide cap on in-flight provider calls, shared by every engine instance
+# so agents fanning out with gather() don't trip provider rate limits
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_SEM = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+
+# reason_batch(use_batch_api=True) only uses the provider Batch API above this size
+BATCH_API_MIN_SIZE = 50
+BATCH_POLL_INTERVAL_S = 30.0
+
+
 # ---------------------------------------------------------------------------
 # Enums & Config
 # ---------------------------------------------------------------------------
@@ -46,20 +88,72 @@ class LLMConfig(BaseModel):
     temperature: float = 0.2
     timeout_seconds: int = 60
     max_retries: int = 3
+    max_backoff_seconds: float = 30.0  # Cap on the 2**attempt retry delay
+    # Connection pool shared by the OpenAI and Anthropic clients
+    http_max_connections: int = 200
+    http_max_keepalive_connections: int = 50
+    http_keepalive_expiry_seconds: float = 300.0
+    # Providers tried after the primary; mock is always the implicit last resort
+    fallback_chain: list[LLMProvider] = Field(
+        default_factory=lambda: [
+            LLMProvider(p.strip())
+            for p in os.getenv("LLM_FALLBACK_CHAIN", "openai,anthropic,mock").split(",")
+        ]
+    )
+    # Consecutive failures that open a provider's circuit, and how long it stays open
+    breaker_fail_threshold: int = Field(
+        default_factory=lambda: int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+    )
+    breaker_reset_seconds: float = Field(
+        default_factory=lambda: float(os.getenv("LLM_BREAKER_RESET_S", "30"))
+    )
+    # Start the next provider if the current one hasn't answered by then (0 = never hedge)
+    hedge_delay_ms: int = Field(
+        default_factory=lambda: int(os.getenv("LLM_HEDGE_DELAY_MS", "2000"))
+    )
+    # Response cache; only used for temperature 0 or reason(..., cacheable=True)
+    cache_enabled: bool = Field(
+        default_factory=lambda: os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    )
+    cache_ttl_seconds: float = Field(
+        default_factory=lambda: float(os.getenv("LLM_CACHE_TTL_S", "3600"))
+    )
+    cache_max_entries: int = Field(
+        default_factory=lambda: int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024"))
+    )
+    cache_redis_url: str = Field(default_factory=lambda: os.getenv("LLM_CACHE_REDIS_URL", ""))
+    # Near-duplicate prompt cache over embeddings (opt-in; same cacheability rule)
+    semantic_cache_enabled: bool = Field(
+        default_factory=lambda: os.getenv("LLM_SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+    )
+    semantic_cache_threshold: float = Field(
+        default_factory=lambda: float(os.getenv("LLM_SEMANTIC_CACHE_THRESHOLD", "0.92"))
+    )
+    openai_embedding_model: str = Field(
+        default_factory=lambda: os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
+    )
+    local_embedding_model: str = Field(
+        default_factory=lambda: os.getenv("LOCAL_EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+    )
 
 
 # ---------------------------------------------------------------------------
 # Prompt Templates
 # ---------------------------------------------------------------------------
 
+# Every template is a static preamble (role, instructions, output schema)
+# followed by PROMPT_INPUT_MARKER and the $variables. Keeping the variable
+# part last lets OpenAI/Anthropic prompt-prefix caching reuse the preamble
+# across calls; _call_openai/_call_anthropic send the two halves separately.
+PROMPT_INPUT_MARKER = "=== INPUT ==="
+
 PROMPT_TEMPLATES: dict[str, str] = {
     "orchestrator_decompose": """
 You are the MasterOrchestrator of OrQuanta, an autonomous GPU cloud platform.
 
-GOAL (from user): "$goal"
-
-Your job is to decompose this goal into concrete sub-tasks, assign each to
-the correct specialist agent, and produce a JSON execution plan.
+Your job is to decompose the user's GOAL (given in the input section) into
+concrete sub-tasks, assign each to the correct specialist agent, and produce
+a JSON execution plan.
 
 Available agents:
 - scheduler_agent: GPU job queue, bin-packing, priority scoring
@@ -83,24 +177,26 @@ Respond ONLY with valid JSON matching this schema:
   "estimated_cost_usd": <float>,
   "estimated_duration_minutes": <int>
 }
+
+=== INPUT ===
+GOAL (from user): "$goal"
 """,
 
     "scheduler_score": """
-You are the SchedulerAgent. Score the following GPU job for priority.
-
-Job details: $job_json
+You are the SchedulerAgent. Score the GPU job given in the input section
+for priority.
 
 Consider: user priority tier, VRAM requirements, cost limit, deadline.
 Reply ONLY with JSON: {"priority_score": <0.0-1.0>, "reasoning": "<brief>"}
+
+=== INPUT ===
+Job details: $job_json
 """,
 
     "cost_optimize": """
 You are the CostOptimizerAgent. Analyse current GPU spot prices and
 recommend the cheapest option meeting requirements.
 
-Requirements: $requirements_json
-Current prices: $prices_json
-
 Reply ONLY with JSON:
 {
   "recommended_provider": "<name>",
@@ -109,15 +205,15 @@ Reply ONLY with JSON:
   "reasoning": "<brief>",
   "alternatives": [{"provider": "", "gpu": "", "cost": 0.0}]
 }
+
+=== INPUT ===
+Requirements: $requirements_json
+Current prices: $prices_json
 """,
 
     "healing_diagnose": """
 You are the HealingAgent. A GPU job has reported anomalous metrics.
 
-Job ID: $job_id
-Metrics snapshot: $metrics_json
-Error log: $error_log
-
 Diagnose the root cause and prescribe an action from:
 [restart, migrate, scale_up, pause, terminate]
 
@@ -129,15 +225,17 @@ Reply ONLY with JSON:
   "confidence": <0.0-1.0>,
   "reasoning": "<chain-of-thought>"
 }
+
+=== INPUT ===
+Job ID: $job_id
+Metrics snapshot: $metrics_json
+Error log: $error_log
 """,
 
     "forecast_analyze": """
 You are the ForecastAgent. Based on historical job patterns, forecast
 GPU demand for the next time window.
 
-Historical data (last 30 days): $history_json
-Current utilization: $utilization_json
-
 Reply ONLY with JSON:
 {
   "forecast_window_hours": 24,
@@ -147,16 +245,16 @@ Reply ONLY with JSON:
   "recommendation": "<pre-provision / hold / scale-down>",
   "reasoning": "<chain-of-thought>"
 }
+
+=== INPUT ===
+Historical data (last 30 days): $history_json
+Current utilization: $utilization_json
 """,
 
     "gpu_recommend": """
 You are the GPU RecommendationAgent for OrQuanta. Based on the user's
 workload description, recommend the optimal GPU type and provider.
 
-Workload: "$workload"
-Available GPUs: $available_gpus
-Current spot prices: $prices_json
-
 Consider: VRAM requirements, estimated training time, cost efficiency,
 model size (parameter count → VRAM mapping: 7B≈16GB, 13B≈28GB, 70B≈80GB).
 
@@ -170,15 +268,154 @@ Reply ONLY with JSON:
   "vram_required_gb": <int>,
   "reasoning": "<chain-of-thought>"
 }
+
+=== INPUT ===
+Workload: "$workload"
+Available GPUs: $available_gpus
+Current spot prices: $prices_json
 """,
 }
 
+# Providers only cache prefixes of at least ~1024 tokens; estimate each
+# template's static preamble at ~4 characters per token
+PROMPT_CACHE_MIN_TOKENS = 1024
+STATIC_PREFIX_TOKENS: dict[str, int] = {
+    name: len(tmpl.partition(PROMPT_INPUT_MARKER)[0]) // 4
+    for name, tmpl in PROMPT_TEMPLATES.items()
+}
+
+# Context window (prompt + completion tokens) by model-name prefix; the
+# longest matching prefix wins and unknown models are not checked
+MODEL_CTX_LIMITS: dict[str, int] = {
+    "gpt-4o": 128_000,
+    "gpt-4-turbo": 128_000,
+    "gpt-4": 8_192,
+    "gpt-3.5-turbo": 16_385,
+    "claude-": 200_000,
+}
+
+
+def _context_limit(model: str) -> int | None:
+    matches = [prefix for prefix in MODEL_CTX_LIMITS if model.startswith(prefix)]
+    return MODEL_CTX_LIMITS[max(matches, key=len)] if matches else None
+
+
+@functools.lru_cache(maxsize=1)
+def _token_encoder() -> Any:
+    """tiktoken encoder, built once (construction is slow); None if not installed."""
+    try:
+        import tiktoken  # type: ignore
+    except ImportError:
+        return None
+    return tiktoken.encoding_for_model("gpt-4o")
+
+
+def estimate_tokens(text: str) -> int:
+    """Prompt tokens: exact with tiktoken, else ~4 characters per token."""
+    encoder = _token_encoder()
+    if encoder is None:
+        return len(text) // 4
+    return len(encoder.encode(text))
+
+
+RENDER_CACHE_SIZE = 1024  # Rendered prompts kept per engine
+
+# Built once; _render_template only encodes the variables a template references
+_COMPILED_TEMPLATES: dict[str, Template] = {
+    name: Template(tmpl) for name, tmpl in PROMPT_TEMPLATES.items()
+}
+_TEMPLATE_FIELDS: dict[str, frozenset[str]] = {
+    name: frozenset(tmpl.get_identifiers()) for name, tmpl in _COMPILED_TEMPLATES.items()
+}
+
+
+# ---------------------------------------------------------------------------
+# Response Schemas
+# ---------------------------------------------------------------------------
+# Mirror the JSON shapes in PROMPT_TEMPLATES. Providers are forced to answer
+# through a single "respond" tool whose parameters are the template's schema,
+# so replies arrive as schema-shaped arguments rather than free text.
+
+RESPONSE_TOOL_NAME = "respond"
+
+
+class OrchestratorTask(BaseModel):
+    task_id: str
+    agent: str
+    action: str
+    parameters: dict[str, Any] = Field(default_factory=dict)
+    priority: int = 5
+    depends_on: list[str] = Field(default_factory=list)
+
+
+class OrchestratorPlan(BaseModel):
+    reasoning: str
+    tasks: list[OrchestratorTask]
+    estimated_cost_usd: float
+    estimated_duration_minutes: int
+
+
+class SchedulerScore(BaseModel):
+    priority_score: float
+    reasoning: str
+
+
+class CostAlternative(BaseModel):
+    provider: str
+    gpu: str
+    cost: float
+
+
+class CostRecommendation(BaseModel):
+    recommended_provider: str
+    recommended_gpu: str
+    estimated_hourly_cost: float
+    reasoning: str
+    alternatives: list[CostAlternative] = Field(default_factory=list)
+
+
+class HealingDiagnosis(BaseModel):
+    diagnosis: str
+    action: Literal["restart", "migrate", "scale_up", "pause", "terminate"]
+    parameters: dict[str, Any] = Field(default_factory=dict)
+    confidence: float
+    reasoning: str
+
+
+class ForecastResult(BaseModel):
+    forecast_window_hours: int
+    predicted_job_count: int
+    predicted_gpu_demand: dict[str, int]
+    confidence_interval: dict[str, float]
+    recommendation: Literal["pre-provision", "hold", "scale-down"]
+    reasoning: str
+
+
+class GPURecommendation(BaseModel):
+    recommended_gpu: str
+    recommended_provider: str
+    recommended_region: str
+    estimated_cost_usd: float
+    estimated_duration_hours: float
+    vram_required_gb: int
+    reasoning: str
+
+
+TEMPLATE_TO_SCHEMA: dict[str, type[BaseModel]] = {
+    "orchestrator_decompose": OrchestratorPlan,
+    "scheduler_score": SchedulerScore,
+    "cost_optimize": CostRecommendation,
+    "healing_diagnose": HealingDiagnosis,
+    "forecast_analyze": ForecastResult,
+    "gpu_recommend": GPURecommendation,
+}
+
 
 # ---------------------------------------------------------------------------
 # Mock "LLM" for zero-dependency testing
 # ---------------------------------------------------------------------------
 
-MOCK_RESPONSES: dict[str, Any] = {
+MOCK_RESPONSES: Mapping[str, Any] = MappingProxyType({
     "orchestrator_decompose": {
         "reasoning": "MOCK: Analysed goal. Decomposing into 3 tasks.",
         "tasks": [
@@ -233,7 +470,355 @@ MOCK_RESPONSES: dict[str, Any] = {
         "recommendation": "pre-provision",
         "reasoning": "MOCK: Monday morning spike pattern detected.",
     },
-}
+})
+
+_MOCK_UNAVAILABLE: Mapping[str, Any] = MappingProxyType({"error": "llm_unavailable"})
+
+
+def _mock_for(template_name: str) -> dict[str, Any]:
+    """Return a private copy of the canned response so callers can't corrupt it."""
+    return deepcopy(dict(MOCK_RESPONSES.get(template_name, _MOCK_UNAVAILABLE)))
+
+# What _call_llm returns when no provider is available (or all failed)
+MOCK_PLACEHOLDER = json.dumps({"mock": True})
+
+
+# ---------------------------------------------------------------------------
+# Response Cache
+# ---------------------------------------------------------------------------
+
+class CacheBackend(Protocol):
+    """Storage for serialized LLM responses, keyed by request hash."""
+
+    async def get(self, key: str) -> str | None: ...
+
+    async def set(self, key: str, value: str, ttl: float) -> None: ...
+
+    async def delete(self, key: str) -> None: ...
+
+
+class InMemoryCacheBackend:
+    """Process-local LRU with per-entry expiry."""
+
+    def __init__(
+        self, max_entries: int = 1024, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._max_entries = max_entries
+        self._clock = clock
+
+    async def get(self, key: str) -> str | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= self._clock():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        self._entries[key] = (self._clock() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    async def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+
+class RedisCacheBackend:
+    """Redis-backed cache shared across processes.
+
+    Redis errors are logged and treated as misses so a cache outage never
+    fails a reasoning call.
+    """
+
+    def __init__(self, url: str) -> None:
+        import redis.asyncio as redis  # type: ignore
+        self._redis = redis.from_url(url, decode_responses=True)
+
+    async def get(self, key: str) -> str | None:
+        try:
+            return await self._redis.get(key)
+        except Exception as exc:
+            logger.warning("LLM cache read failed: %s", exc)
+            return None
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        try:
+            await self._redis.set(key, value, ex=max(1, int(ttl)))
+        except Exception as exc:
+            logger.warning("LLM cache write failed: %s", exc)
+
+    async def delete(self, key: str) -> None:
+        try:
+            await self._redis.delete(key)
+        except Exception as exc:
+            logger.warning("LLM cache delete failed: %s", exc)
+
+
+class LLMCache:
+    """Parsed LLM responses keyed by a hash of everything that shapes them.
+
+    Values are stored as JSON, so every hit hands back a fresh dict that
+    callers may mutate freely.
+    """
+
+    KEY_PREFIX = "orquanta:llm:"
+
+    def __init__(self, backend: CacheBackend, ttl_seconds: float) -> None:
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+
+    @classmethod
+    def make_key(cls, **parts: Any) -> str:
+        payload = _dumps(parts, sort_keys=True, default=str)
+        return cls.KEY_PREFIX + hashlib.sha256(payload).hexdigest()
+
+    async def get(self, key: str) -> dict[str, Any] | None:
+        raw = await self.backend.get(key)
+        return None if raw is None else _loads(raw)
+
+    async def set(self, key: str, value: dict[str, Any]) -> None:
+        await self.backend.set(key, _dumps(value).decode(), self.ttl_seconds)
+
+
+class _SemanticBucket:
+    """Fixed-capacity ring of unit embeddings and the responses they map to."""
+
+    __slots__ = ("vectors", "values", "expires", "head", "size")
+
+    def __init__(self, capacity: int, dim: int) -> None:
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.values: list[str | None] = [None] * capacity
+        self.expires = np.zeros(capacity, dtype=np.float64)
+        self.head = 0
+        self.size = 0
+
+
+class SemanticLLMCache:
+    """Serve near-duplicate prompts by cosine similarity of their embeddings.
+
+    Vectors are kept per template so, e.g., an ``orchestrator_decompose``
+    prompt is never matched against ``healing_diagnose`` entries. Lookup is
+    an exact inner-product scan over L2-normalized vectors, which is cheap at
+    the bucket sizes used here.
+    """
+
+    def __init__(
+        self,
+        embed: Callable[[str], Awaitable[np.ndarray]],
+        threshold: float = 0.92,
+        max_entries: int = 1024,
+        ttl_seconds: float = 3600.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._embed = embed
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._buckets: dict[str, _SemanticBucket] = {}
+
+    @staticmethod
+    def normalize_prompt(prompt: str) -> str:
+        """Collapse whitespace (incl. rendered JSON indentation) before embedding."""
+        return " ".join(prompt.split())
+
+    async def embed(self, prompt: str) -> np.ndarray:
+        vec = np.asarray(await self._embed(self.normalize_prompt(prompt)), dtype=np.float32)
+        norm = float(np.linalg.norm(vec))
+        return vec / norm if norm else vec
+
+    def get(self, template_name: str, vec: np.ndarray) -> dict[str, Any] | None:
+        bucket = self._buckets.get(template_name)
+        if bucket is None or not bucket.size or bucket.vectors.shape[1] != vec.shape[0]:
+            return None
+        sims = bucket.vectors[:bucket.size] @ vec
+        sims[bucket.expires[:bucket.size] <= self._clock()] = -np.inf
+        best = int(sims.argmax())
+        if sims[best] < self.threshold:
+            return None
+        return _loads(bucket.values[best])
+
+    def set(self, template_name: str, vec: np.ndarray, value: dict[str, Any]) -> None:
+        bucket = self._buckets.get(template_name)
+        if bucket is None or bucket.vectors.shape[1] != vec.shape[0]:
+            # New template, or the embedding model changed dimension
+            bucket = self._buckets[template_name] = _SemanticBucket(self.max_entries, vec.shape[0])
+        i = bucket.head
+        bucket.vectors[i] = vec
+        bucket.values[i] = _dumps(value).decode()
+        bucket.expires[i] = self._clock() + self.ttl_seconds
+        bucket.head = (i + 1) % self.max_entries
+        bucket.size = min(bucket.size + 1, self.max_entries)
+
+
+# ---------------------------------------------------------------------------
+# Circuit Breaker
+# ---------------------------------------------------------------------------
+
+class BreakerState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitOpen(RuntimeError):
+    """Raised instead of calling a provider whose circuit is open."""
+
+
+class CircuitBreaker:
+    """Stops calling a provider after repeated failures.
+
+    After ``fail_threshold`` consecutive failures the circuit opens and calls
+    are refused for ``reset_timeout`` seconds. It then goes half-open: the
+    next call is let through as a probe, and its outcome closes or re-opens
+    the circuit. Callers arriving while the probe is in flight are refused.
+    """
+
+    def __init__(
+        self,
+        fail_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.fail_threshold = fail_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._probing = False  # A half-open probe call is in flight
+        self._clock = clock
+
+    @property
+    def state(self) -> BreakerState:
+        if self.opened_at is None:
+            return BreakerState.CLOSED
+        if self._probing or self._clock() - self.opened_at < self.reset_timeout:
+            return BreakerState.OPEN
+        return BreakerState.HALF_OPEN
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead; a half-open circuit admits one probe."""
+        state = self.state
+        if state == BreakerState.HALF_OPEN:
+            self._probing = True
+        return state != BreakerState.OPEN
+
+    def check(self) -> None:
+        if not self.allow():
+            if self._probing:
+                raise CircuitOpen("circuit half-open, probe call in flight")
+            raise CircuitOpen(f"circuit open for another {self._remaining():.0f}s")
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._probing or self.failures >= self.fail_threshold:
+            self.opened_at = self._clock()
+        self._probing = False
+
+    def release(self) -> None:
+        """Give up an admitted call without an outcome, e.g. when it is cancelled."""
+        self._probing = False
+
+    def _remaining(self) -> float:
+        return self.reset_timeout - (self._clock() - (self.opened_at or 0.0))
+
+
+# ---------------------------------------------------------------------------
+# Streaming
+# ---------------------------------------------------------------------------
+
+class _StreamingArrayParser:
+    """Pull finished objects out of one top-level JSON array as text arrives.
+
+    Tracks nesting and string state across chunks, so an item is emitted as
+    soon as its closing brace streams in, e.g. each entry of a plan's
+    ``"tasks"`` array.
+    """
+
+    def __init__(self, key: str) -> None:
+        self.key = key
+        self.text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_key: str | None = None
+        self._array_state = "before"  # before → inside → after
+        self._item_start = -1
+
+    def feed(self, chunk: str) -> list[Any]:
+        self.text += chunk
+        text = self.text
+        items: list[Any] = []
+        for i in range(self._pos, len(text)):
+            c = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_key = text[self._string_start + 1:i]
+                continue
+            if c == '"':
+                self._in_string = True
+                self._string_start = i
+            elif c in "{[":
+                if self._array_state == "inside" and self._depth == 2 and c == "{":
+                    self._item_start = i
+                elif self._depth == 1 and c == "[" and self._last_key == self.key \
+                        and self._array_state == "before":
+                    self._array_state = "inside"
+                self._depth += 1
+            elif c in "}]":
+                self._depth -= 1
+                if self._array_state == "inside":
+                    if self._depth == 2 and c == "}" and self._item_start >= 0:
+                        items.append(_loads(text[self._item_start:i + 1]))
+                        self._item_start = -1
+                    elif self._depth == 1 and c == "]":
+                        self._array_state = "after"
+        self._pos = len(text)
+        return items
+
+
+def _array_item_model(schema: type[BaseModel] | None, key: str) -> type[BaseModel] | None:
+    """Item model of a ``list[Model]`` field of ``schema`` (None if it isn't one)."""
+    field = schema.model_fields.get(key) if schema is not None else None
+    args = get_args(field.annotation) if field is not None else ()
+    if args and isinstance(args[0], type) and issubclass(args[0], BaseModel):
+        return args[0]
+    return None
+
+
+class ReasoningStream:
+    """Async iterator over the items of one response array as they stream.
+
+    After iteration ends, ``result`` holds the full validated response (the
+    same dict reason() would have returned).
+    """
+
+    def __init__(self) -> None:
+        self.result: dict[str, Any] = {}
+        self._items: Any = None  # Async generator set by reason_stream()
+
+    def __aiter__(self) -> "ReasoningStream":
+        return self
+
+    async def __anext__(self) -> Any:
+        return await self._items.__anext__()
 
 
 # ---------------------------------------------------------------------------
@@ -253,7 +838,20 @@ class LLMReasoningEngine:
         self.cfg = config or LLMConfig()
         self._openai_client: Any = None
         self._anthropic_client: Any = None
+        self._http_client: Any = None
+        self._breakers: dict[tuple[LLMProvider, str], CircuitBreaker] = {}
         self._init_clients()
+        self._local_embedder: Any = None
+        self._render_cache: OrderedDict[tuple[str, bytes], str] = OrderedDict()
+        self.cache = self._init_cache()
+        self.semantic_cache = self._init_semantic_cache()
+        self.stats: dict[str, int] = {"cache_hits": 0, "cache_misses": 0, "semantic_hits": 0}
+        short = sorted(n for n, t in STATIC_PREFIX_TOKENS.items() if t < PROMPT_CACHE_MIN_TOKENS)
+        if short:
+            logger.debug(
+                "Static prompt prefixes below the ~%d-token provider cache minimum: %s",
+                PROMPT_CACHE_MIN_TOKENS, ", ".join(short),
+            )
         logger.info(f"LLMReasoningEngine initialised with provider: {self.cfg.provider}")
 
     # ------------------------------------------------------------------
@@ -261,49 +859,156 @@ class LLMReasoningEngine:
     # ------------------------------------------------------------------
 
     def _init_clients(self) -> None:
-        """Initialise all available LLM clients.
+        """Work out which LLM providers are usable.
 
         AUTO mode: detect from API keys (OpenAI → Anthropic → Mock).
-        Explicit mode: initialise the specified provider.
-        Either way, we try to init ALL available clients for fallback.
+        Explicit mode: use the specified provider.
+        A provider counts as available when its key is set and its SDK is
+        installed; the SDK itself is only imported on the first real call
+        (see _openai() / _anthropic()), so MOCK engines never pay for it.
         """
-        # Try OpenAI
-        if self.cfg.openai_api_key:
-            try:
-                import openai  # type: ignore
-                self._openai_client = openai.AsyncOpenAI(api_key=self.cfg.openai_api_key)
-                logger.info("OpenAI client initialised (available for reasoning).")
-            except ImportError:
-                logger.warning("openai package not installed — skipping OpenAI.")
-
-        # Try Anthropic
-        if self.cfg.anthropic_api_key:
-            try:
-                import anthropic  # type: ignore
-                self._anthropic_client = anthropic.AsyncAnthropic(
-                    api_key=self.cfg.anthropic_api_key
-                )
-                logger.info("Anthropic client initialised (available for fallback).")
-            except ImportError:
-                logger.warning("anthropic package not installed — skipping Anthropic.")
+        self._sdk_ready = {
+            LLMProvider.OPENAI: self._sdk_installed(self.cfg.openai_api_key, "openai"),
+            LLMProvider.ANTHROPIC: self._sdk_installed(self.cfg.anthropic_api_key, "anthropic"),
+        }
+        openai_ok = self._has_client(LLMProvider.OPENAI)
+        anthropic_ok = self._has_client(LLMProvider.ANTHROPIC)
 
-        # Auto-detect primary provider from available clients
+        # Auto-detect primary provider from available SDKs
         if self.cfg.provider == LLMProvider.AUTO:
-            if self._openai_client:
+            if openai_ok:
                 self.cfg.provider = LLMProvider.OPENAI
                 logger.info("AUTO: Selected OpenAI as primary LLM provider.")
-            elif self._anthropic_client:
+            elif anthropic_ok:
                 self.cfg.provider = LLMProvider.ANTHROPIC
                 logger.info("AUTO: Selected Anthropic as primary LLM provider.")
             else:
                 self.cfg.provider = LLMProvider.MOCK
                 logger.info("AUTO: No API keys found — using MOCK provider.")
-        elif self.cfg.provider == LLMProvider.OPENAI and not self._openai_client:
+        elif self.cfg.provider == LLMProvider.OPENAI and not openai_ok:
             logger.warning("OpenAI requested but not available. Falling back.")
-            self.cfg.provider = LLMProvider.ANTHROPIC if self._anthropic_client else LLMProvider.MOCK
-        elif self.cfg.provider == LLMProvider.ANTHROPIC and not self._anthropic_client:
+            self.cfg.provider = LLMProvider.ANTHROPIC if anthropic_ok else LLMProvider.MOCK
+        elif self.cfg.provider == LLMProvider.ANTHROPIC and not anthropic_ok:
             logger.warning("Anthropic requested but not available. Falling back.")
-            self.cfg.provider = LLMProvider.OPENAI if self._openai_client else LLMProvider.MOCK
+            self.cfg.provider = LLMProvider.OPENAI if openai_ok else LLMProvider.MOCK
+
+    @staticmethod
+    def _sdk_installed(api_key: str | None, module: str) -> bool:
+        """True when a key is configured and the SDK can be imported (without importing it)."""
+        if not api_key:
+            return False
+        if importlib.util.find_spec(module) is None:
+            logger.warning("%s package not installed — skipping %s.", module, module)
+            return False
+        return True
+
+    def _has_client(self, provider: LLMProvider) -> bool:
+        """Whether calls can be routed to ``provider`` (client built or buildable)."""
+        if provider == LLMProvider.OPENAI:
+            return self._openai_client is not None or self._sdk_ready[provider]
+        if provider == LLMProvider.ANTHROPIC:
+            return self._anthropic_client is not None or self._sdk_ready[provider]
+        return False
+
+    def _openai(self) -> Any:
+        """The OpenAI client, importing the SDK and building it on first use."""
+        if self._openai_client is None:
+            if not self._sdk_ready[LLMProvider.OPENAI]:
+                raise RuntimeError("OpenAI client not initialised.")
+            import openai  # type: ignore
+            self._openai_client = openai.AsyncOpenAI(
+                api_key=self.cfg.openai_api_key, http_client=self._shared_http_client()
+            )
+            logger.info("OpenAI client initialised.")
+        return self._openai_client
+
+    def _anthropic(self) -> Any:
+        """The Anthropic client, importing the SDK and building it on first use."""
+        if self._anthropic_client is None:
+            if not self._sdk_ready[LLMProvider.ANTHROPIC]:
+                raise RuntimeError("Anthropic client not initialised.")
+            import anthropic  # type: ignore
+            self._anthropic_client = anthropic.AsyncAnthropic(
+                api_key=self.cfg.anthropic_api_key, http_client=self._shared_http_client()
+            )
+            logger.info("Anthropic client initialised.")
+        return self._anthropic_client
+
+    def _shared_http_client(self) -> Any:
+        """One pooled httpx client for both SDKs (None → SDK default client).
+
+        Sized for many concurrent agent calls; HTTP/2 multiplexing is used
+        when the optional ``h2`` package is installed.
+        """
+        if self._http_client is None:
+            try:
+                import httpx
+            except ImportError:
+                return None
+            self._http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.cfg.http_max_connections,
+                    max_keepalive_connections=self.cfg.http_max_keepalive_connections,
+                    keepalive_expiry=self.cfg.http_keepalive_expiry_seconds,
+                ),
+                http2=importlib.util.find_spec("h2") is not None,
+                timeout=httpx.Timeout(self.cfg.timeout_seconds, connect=5.0),
+            )
+        return self._http_client
+
+    async def close(self) -> None:
+        """Close pooled provider connections."""
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+
+    def _init_cache(self) -> LLMCache | None:
+        """Build the response cache (Redis when configured, else in-process)."""
+        if not self.cfg.cache_enabled:
+            return None
+        backend: CacheBackend | None = None
+        if self.cfg.cache_redis_url:
+            try:
+                backend = RedisCacheBackend(self.cfg.cache_redis_url)
+            except ImportError:
+                logger.warning("redis package not installed — using in-process LLM cache.")
+        if backend is None:
+            backend = InMemoryCacheBackend(self.cfg.cache_max_entries)
+        return LLMCache(backend, self.cfg.cache_ttl_seconds)
+
+    def _init_semantic_cache(self) -> SemanticLLMCache | None:
+        """Build the embedding cache when enabled and an embedder is available.
+
+        OpenAI embeddings are used when that client is configured, otherwise a
+        local sentence-transformers model; with neither, the cache is off.
+        """
+        if not (self.cfg.semantic_cache_enabled and self.cfg.cache_enabled):
+            return None
+        if not self._has_client(LLMProvider.OPENAI):
+            try:
+                from sentence_transformers import SentenceTransformer  # type: ignore
+                self._local_embedder = SentenceTransformer(self.cfg.local_embedding_model)
+            except ImportError:
+                logger.warning(
+                    "No embedding backend (OpenAI or sentence-transformers) — "
+                    "semantic cache disabled."
+                )
+                return None
+        return SemanticLLMCache(
+            self._embed,
+            threshold=self.cfg.semantic_cache_threshold,
+            max_entries=self.cfg.cache_max_entries,
+            ttl_seconds=self.cfg.cache_ttl_seconds,
+        )
+
+    async def _embed(self, text: str) -> np.ndarray:
+        """Embed text with OpenAI, or the local model when offline."""
+        if self._has_client(LLMProvider.OPENAI):
+            response = await self._openai().embeddings.create(
+                model=self.cfg.openai_embedding_model, input=text
+            )
+            return np.asarray(response.data[0].embedding, dtype=np.float32)
+        return await asyncio.to_thread(self._local_embedder.encode, text)
 
     # ------------------------------------------------------------------
     # Public API
@@ -314,6 +1019,7 @@ class LLMReasoningEngine:
         template_name: str,
         variables: dict[str, Any],
         agent_name: str = "unknown",
+        cacheable: bool = False,
     ) -> dict[str, Any]:
         """Execute a reasoning call using the named prompt template.
         
@@ -321,124 +1027,602 @@ class LLMReasoningEngine:
             template_name: Key in PROMPT_TEMPLATES.
             variables: Dict of substitution variables for the template.
             agent_name: Calling agent name (for logging).
+            cacheable: Serve identical requests from the response cache even
+                though temperature > 0 (temperature 0 is always cacheable).
             
         Returns:
             Parsed JSON dict from LLM response.
         """
-        prompt = self._render_template(template_name, variables)
+        if self.cfg.provider == LLMProvider.MOCK:
+            # Nothing to call: skip rendering, caching and the JSON round-trip
+            return _mock_for(template_name)
+
+        prompt = self._fit_prompt(template_name, variables, agent_name)
+        if prompt is None:
+            return _mock_for(template_name)
+
+        cached, cache_key, vec = await self._cache_lookup(
+            template_name, prompt, agent_name, cacheable
+        )
+        if cached is not None:
+            return cached
         
         logger.info(f"[{agent_name}] Calling LLM ({self.cfg.provider}) with template '{template_name}'")
         
         for attempt in range(1, self.cfg.max_retries + 1):
             try:
-                raw = await self._call_llm(prompt)
-                parsed = self._parse_json_response(raw)
+                async with LLM_SEM:  # Backoff below runs outside the slot
+                    raw = await self._call_llm(prompt, TEMPLATE_TO_SCHEMA.get(template_name))
+                parsed = self._parse_response(template_name, raw)
                 logger.info(f"[{agent_name}] LLM call succeeded on attempt {attempt}.")
+                await self._cache_store(template_name, cache_key, vec, parsed)
                 return parsed
             except Exception as exc:
                 logger.warning(f"[{agent_name}] LLM attempt {attempt} failed: {exc}")
                 if attempt == self.cfg.max_retries:
                     logger.error(f"[{agent_name}] All LLM retries exhausted. Using mock fallback.")
-                    return MOCK_RESPONSES.get(template_name, {"error": "llm_unavailable"})
-                time.sleep(2 ** attempt)  # Exponential backoff
+                    return _mock_for(template_name)
+                # Exponential backoff plus jitter so callers hit by the same outage spread out
+                await asyncio.sleep(
+                    min(2 ** attempt, self.cfg.max_backoff_seconds) + random.uniform(0, 1)
+                )
+
+        return _mock_for(template_name)
 
-        return MOCK_RESPONSES.get(template_name, {"error": "llm_unavailable"})
+    async def _cache_lookup(
+        self, template_name: str, prompt: str, agent_name: str, cacheable: bool
+    ) -> tuple[dict[str, Any] | None, str | None, np.ndarray | None]:
+        """Serve a prompt from the exact, then the semantic, response cache.
+
+        Returns ``(hit, cache_key, embedding)``; on a miss the key and
+        embedding (None when the call isn't cacheable) go to _cache_store().
+        """
+        if self.cache is None or not (cacheable or self.cfg.temperature == 0):
+            return None, None, None
+        cache_key = self._cache_key(template_name, prompt)
+        cached = await self.cache.get(cache_key)
+        if cached is not None:
+            self.stats["cache_hits"] += 1
+            logger.info("[%s] LLM cache hit for template '%s'.", agent_name, template_name)
+            return cached, cache_key, None
+        self.stats["cache_misses"] += 1
+
+        vec = None
+        if self.semantic_cache is not None:
+            try:
+                vec = await self.semantic_cache.embed(prompt)
+            except Exception as exc:
+                logger.warning("[%s] Prompt embedding failed: %s", agent_name, exc)
+            if vec is not None:
+                similar = self.semantic_cache.get(template_name, vec)
+                if similar is not None:
+                    self.stats["semantic_hits"] += 1
+                    logger.info("[%s] LLM semantic cache hit for '%s'.", agent_name, template_name)
+                    return similar, cache_key, vec
+        return None, cache_key, vec
+
+    async def _cache_store(
+        self,
+        template_name: str,
+        cache_key: str | None,
+        vec: np.ndarray | None,
+        parsed: dict[str, Any],
+    ) -> None:
+        # Don't pin the placeholder _call_llm returns when every provider failed
+        if cache_key is not None and parsed.get("mock") is not True:
+            await self.cache.set(cache_key, parsed)
+            if vec is not None:
+                self.semantic_cache.set(template_name, vec, parsed)
+
+    def reason_stream(
+        self,
+        template_name: str,
+        variables: dict[str, Any],
+        agent_name: str = "unknown",
+        item_key: str = "tasks",
+    ) -> ReasoningStream:
+        """Like reason(), but yields each ``item_key`` array entry as soon as it
+        has streamed in, so callers can act on the first items early.
+
+        Items are validated against the template schema's item model before
+        they are yielded. The prompt is size-checked and the response caches
+        are consulted and filled as in reason().
+
+        Streams from the primary provider only. Without a live provider the
+        call goes through reason() and its items are yielded from the final
+        response. A streaming error before the first item also falls back
+        to reason(); after that it propagates, since the plan is partial.
+
+        The stream holds one LLM_SEM slot for as long as the reply is being
+        generated, because it occupies a provider connection that long.
+        Work the caller starts on early items, including its own reason()
+        calls, shares the remaining slots.
+        """
+        stream = ReasoningStream()
+        stream._items = self._stream_items(stream, template_name, variables, agent_name, item_key)
+        return stream
+
+    async def _stream_items(
+        self,
+        stream: ReasoningStream,
+        template_name: str,
+        variables: dict[str, Any],
+        agent_name: str,
+        item_key: str,
+    ) -> Any:
+        schema = TEMPLATE_TO_SCHEMA.get(template_name)
+        item_model = _array_item_model(schema, item_key)
+        provider = self.cfg.provider
+        breaker = self._breaker(provider) if self._has_client(provider) else None
+        chunks = None
+        # With the primary's circuit open, reason() routes to the fallbacks instead
+        if breaker is not None and breaker.state != BreakerState.OPEN:
+            # An oversized prompt is trimmed, or rejected by reason() below
+            prompt = self._fit_prompt(template_name, variables, agent_name)
+            if prompt is not None:
+                cached, cache_key, vec = await self._cache_lookup(
+                    template_name, prompt, agent_name, cacheable=False
+                )
+                if cached is not None:
+                    stream.result = cached
+                    for item in cached.get(item_key, []):
+                        yield item
+                    return
+                # Refused while another caller holds the half-open probe
+                if breaker.allow():
+                    stream_fn = (
+                        self._stream_openai if provider == LLMProvider.OPENAI
+                        else self._stream_anthropic
+                    )
+                    chunks = stream_fn(prompt, schema)
+
+        yielded = 0
+        if chunks is not None:
+            parser = _StreamingArrayParser(item_key)
+            received = False
+            try:
+                async with LLM_SEM:
+                    async for chunk in chunks:
+                        for item in parser.feed(chunk):
+                            if item_model is not None:
+                                item = item_model.model_validate(item).model_dump()
+                            yielded += 1
+                            yield item
+                received = True
+                breaker.record_success()
+                stream.result = self._parse_response(template_name, parser.text)
+                await self._cache_store(template_name, cache_key, vec, stream.result)
+                logger.info("[%s] Streamed %d '%s' items.", agent_name, yielded, item_key)
+                return
+            except Exception as exc:
+                # An off-schema reply isn't a provider outage
+                if not received and not isinstance(exc, ValidationError):
+                    breaker.record_failure()
+                else:
+                    breaker.release()
+                if yielded:
+                    raise
+                logger.warning("[%s] LLM stream failed (%s); using reason().", agent_name, exc)
+            except BaseException:
+                breaker.release()  # Consumer stopped iterating, or was cancelled
+                raise
+
+        stream.result = await self.reason(template_name, variables, agent_name)
+        for item in stream.result.get(item_key, []):
+            yield item
+
+    async def _stream_openai(self, prompt: str, schema: type[BaseModel] | None) -> Any:
+        """Yield the reply text (or tool-call argument) fragments from OpenAI."""
+        response = await self._openai().chat.completions.create(
+            **self._openai_request(prompt, schema),
+            stream=True,
+            timeout=self.cfg.timeout_seconds,
+        )
+        async for chunk in response:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            if schema is None:
+                fragment = delta.content
+            else:
+                fragment = delta.tool_calls[0].function.arguments if delta.tool_calls else None
+            if fragment:
+                yield fragment
+
+    async def _stream_anthropic(self, prompt: str, schema: type[BaseModel] | None) -> Any:
+        """Yield the reply text (or tool input JSON) fragments from Anthropic."""
+        request = self._anthropic_request(prompt, schema)
+        async with self._anthropic().messages.stream(**request) as response:
+            async for event in response:
+                if event.type != "content_block_delta":
+                    continue
+                if event.delta.type == "input_json_delta":
+                    yield event.delta.partial_json
+                elif event.delta.type == "text_delta":
+                    yield event.delta.text
+
+    async def reason_batch(
+        self,
+        template_name: str,
+        variables_list: list[dict[str, Any]],
+        agent_name: str = "unknown",
+        use_batch_api: bool = False,
+    ) -> list[dict[str, Any]]:
+        """Run one template over many independent inputs; results keep input order.
+
+        By default the calls run concurrently through reason() (so the shared
+        LLM_SEM bounds them). With ``use_batch_api`` and more than
+        BATCH_API_MIN_SIZE inputs on OpenAI, they go through the Batch API
+        instead: half price, but completion can take minutes to hours. Any
+        Batch API error falls back to the concurrent path.
+        """
+        if (
+            use_batch_api
+            and len(variables_list) > BATCH_API_MIN_SIZE
+            and self.cfg.provider == LLMProvider.OPENAI
+            and self._has_client(LLMProvider.OPENAI)
+        ):
+            try:
+                return await self._openai_batch(template_name, variables_list, agent_name)
+            except Exception as exc:
+                logger.warning(
+                    "[%s] Batch API run failed (%s); falling back to concurrent calls.",
+                    agent_name, exc,
+                )
+        return list(await asyncio.gather(
+            *(self.reason(template_name, variables, agent_name) for variables in variables_list)
+        ))
+
+    async def _openai_batch(
+        self, template_name: str, variables_list: list[dict[str, Any]], agent_name: str
+    ) -> list[dict[str, Any]]:
+        """Submit one OpenAI batch job, poll it to completion and parse the replies."""
+        schema = TEMPLATE_TO_SCHEMA.get(template_name)
+        lines = [
+            _dumps({
+                "custom_id": str(i),
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": self._openai_request(self._render_template(template_name, v), schema),
+            })
+            for i, v in enumerate(variables_list)
+        ]
+        client = self._openai()
+        batch_input = await client.files.create(
+            file=("requests.jsonl", b"\n".join(lines)), purpose="batch"
+        )
+        batch = await client.batches.create(
+            input_file_id=batch_input.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+        )
+        logger.info("[%s] Submitted batch %s (%d requests).", agent_name, batch.id, len(lines))
+        while batch.status not in ("completed", "failed", "expired", "cancelled"):
+            await asyncio.sleep(BATCH_POLL_INTERVAL_S)
+            batch = await client.batches.retrieve(batch.id)
+        if batch.status != "completed" or not batch.output_file_id:
+            raise RuntimeError(f"batch {batch.id} ended with status '{batch.status}'")
+
+        output = await client.files.content(batch.output_file_id)
+        results: list[dict[str, Any] | None] = [None] * len(variables_list)
+        for line in output.text.splitlines():
+            record = _loads(line)
+            try:
+                message = record["response"]["body"]["choices"][0]["message"]
+                raw = (
+                    message["content"] if schema is None
+                    else message["tool_calls"][0]["function"]["arguments"]
+                )
+                results[int(record["custom_id"])] = self._parse_response(template_name, raw)
+            except (KeyError, IndexError, TypeError, ValueError) as exc:
+                logger.warning(
+                    "[%s] Batch item %s unusable: %s", agent_name, record.get("custom_id"), exc
+                )
+        # Anything the batch didn't answer goes through the live path
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            retried = await asyncio.gather(
+                *(self.reason(template_name, variables_list[i], agent_name) for i in missing)
+            )
+            for i, result in zip(missing, retried):
+                results[i] = result
+        return results  # type: ignore[return-value]
 
     # ------------------------------------------------------------------
     # Internal helpers
     # ------------------------------------------------------------------
 
+    def _cache_key(self, template_name: str, prompt: str) -> str:
+        """Hash every input that shapes the response for the current provider."""
+        model = {
+            LLMProvider.OPENAI: self.cfg.openai_model,
+            LLMProvider.ANTHROPIC: self.cfg.anthropic_model,
+        }.get(self.cfg.provider, "mock")
+        return LLMCache.make_key(
+            provider=self.cfg.provider.value,
+            model=model,
+            template=template_name,
+            prompt=prompt,
+            temperature=self.cfg.temperature,
+            max_tokens=self.cfg.max_tokens,
+        )
+
     def _render_template(self, name: str, variables: dict[str, Any]) -> str:
         """Substitute variables into the named prompt template."""
-        tmpl_str = PROMPT_TEMPLATES.get(name, "")
-        if not tmpl_str:
+        tmpl = _COMPILED_TEMPLATES.get(name)
+        if tmpl is None:
             raise ValueError(f"Unknown prompt template: '{name}'")
 
+        # Only variables the template references matter (e.g. the
+        # orchestrator's past_context is never rendered)
+        fields = _TEMPLATE_FIELDS[name]
+        used = {k: v for k, v in variables.items() if k in fields}
+
+        # Identical inputs (e.g. retried healing diagnoses) reuse the rendered
+        # prompt; the compact key encoding is cheaper than indented rendering
+        key: tuple[str, bytes] | None
+        try:
+            key = (name, _dumps(used, sort_keys=True, default=str))
+        except TypeError:
+            key = None  # Unencodable dict/list contents; render uncached
+        if key is not None:
+            prompt = self._render_cache.get(key)
+            if prompt is not None:
+                self._render_cache.move_to_end(key)
+                return prompt
+
         # Convert dict values to JSON strings for insertion
         str_vars: dict[str, str] = {}
-        for k, v in variables.items():
+        for k, v in used.items():
             if isinstance(v, (dict, list)):
-                str_vars[k] = json.dumps(v, indent=2)
+                str_vars[k] = _dumps(v, indent=True).decode()
             else:
                 str_vars[k] = str(v)
 
-        return Template(tmpl_str).safe_substitute(str_vars)
+        prompt = tmpl.safe_substitute(str_vars)
+        if key is not None:
+            self._render_cache[key] = prompt
+            if len(self._render_cache) > RENDER_CACHE_SIZE:
+                self._render_cache.popitem(last=False)
+        return prompt
+
+    def _provider_chain(self) -> list[LLMProvider]:
+        """Providers to try, primary first, then cfg.fallback_chain order.
+
+        Only providers with a usable client are included; the mock
+        placeholder is always the implicit last resort.
+        """
+        chain: list[LLMProvider] = []
+        for provider in (self.cfg.provider, *self.cfg.fallback_chain):
+            if self._has_client(provider) and provider not in chain:
+                chain.append(provider)
+        return chain
+
+    def _model_for(self, provider: LLMProvider) -> str:
+        if provider == LLMProvider.OPENAI:
+            return self.cfg.openai_model
+        return self.cfg.anthropic_model
+
+    def _fit_prompt(
+        self, template_name: str, variables: dict[str, Any], agent_name: str
+    ) -> str | None:
+        """Render the prompt, trimmed to fit every provider's context window.
 
-    async def _call_llm(self, prompt: str) -> str:
+        An oversized prompt is uploaded (and on some endpoints billed) only to
+        be rejected, so it is checked locally first. While it is too long, the
+        oldest half of the largest list-valued variable is dropped. Returns
+        None when nothing is left to trim.
+        """
+        prompt = self._render_template(template_name, variables)
+        limits = [
+            limit for provider in self._provider_chain()
+            if (limit := _context_limit(self._model_for(provider))) is not None
+        ]
+        if not limits:
+            return prompt
+        budget = min(limits) - self.cfg.max_tokens
+        # Tokens never outnumber characters, so typical prompts skip tokenizing
+        if len(prompt) <= budget:
+            return prompt
+
+        trimmed = dict(variables)
+        fields = _TEMPLATE_FIELDS[template_name]
+        while (tokens := estimate_tokens(prompt)) > budget:
+            lists = [k for k, v in trimmed.items() if k in fields and isinstance(v, list) and v]
+            if not lists:
+                logger.error(
+                    "[%s] Prompt for '%s' is ~%d tokens, over the %d-token budget; not sent.",
+                    agent_name, template_name, tokens, budget,
+                )
+                return None
+            key = max(lists, key=lambda k: len(_dumps(trimmed[k], default=str)))
+            items = trimmed[key]
+            trimmed[key] = items[(len(items) + 1) // 2:]
+            logger.warning(
+                "[%s] Prompt for '%s' over budget (~%d tokens); kept the newest %d of %d '%s'.",
+                agent_name, template_name, tokens, len(trimmed[key]), len(items), key,
+            )
+            prompt = self._render_template(template_name, trimmed)
+        return prompt
+
+    def _breaker(self, provider: LLMProvider) -> CircuitBreaker:
+        """The circuit breaker for ``provider`` and its configured model."""
+        model = self._model_for(provider)
+        breaker = self._breakers.get((provider, model))
+        if breaker is None:
+            breaker = self._breakers[(provider, model)] = CircuitBreaker(
+                self.cfg.breaker_fail_threshold, self.cfg.breaker_reset_seconds
+            )
+        return breaker
+
+    async def _call_provider(
+        self, provider: LLMProvider, prompt: str, schema: type[BaseModel] | None
+    ) -> str:
+        """One provider call under its circuit breaker and the request timeout.
+
+        Errors and timeouts count against the breaker; a hedged call that is
+        cancelled because another provider won does not.
+        """
+        breaker = self._breaker(provider)
+        breaker.check()
+        call = self._call_openai if provider == LLMProvider.OPENAI else self._call_anthropic
+        try:
+            raw = await asyncio.wait_for(call(prompt, schema), self.cfg.timeout_seconds)
+        except Exception:
+            breaker.record_failure()
+            if breaker.state != BreakerState.CLOSED:
+                logger.warning(
+                    "%s circuit open after %d failures.", provider.value, breaker.failures
+                )
+            raise
+        except BaseException:
+            breaker.release()
+            raise
+        breaker.record_success()
+        return raw
+
+    async def _call_llm(self, prompt: str, schema: type[BaseModel] | None = None) -> str:
         """Dispatch to LLM with automatic fallback chain.
 
         Chain: Primary provider → Secondary provider → Mock.
-        This ensures the platform always returns a response.
+        This ensures the platform always returns a response. With a
+        ``schema``, providers answer through the forced ``respond`` tool and
+        the returned string is that tool call's JSON arguments.
+
+        A failed provider hands over to the next one immediately. If the one
+        in flight is merely slow, the next is also started (hedged) after
+        ``hedge_delay_ms`` and whichever answers first wins; the rest are
+        cancelled. Providers whose circuit breaker is open are skipped.
         """
         if self.cfg.provider == LLMProvider.MOCK:
-            return json.dumps({"mock": True})
+            return MOCK_PLACEHOLDER
 
-        # Try primary provider
-        primary_error = None
-        if self.cfg.provider == LLMProvider.OPENAI and self._openai_client:
-            try:
-                return await self._call_openai(prompt)
-            except Exception as exc:
-                primary_error = exc
-                logger.warning(f"OpenAI call failed: {exc}")
+        chain = [
+            p for p in self._provider_chain() if self._breaker(p).state != BreakerState.OPEN
+        ]
+        hedge_delay = self.cfg.hedge_delay_ms / 1000 if self.cfg.hedge_delay_ms > 0 else None
+        running: dict[asyncio.Task, LLMProvider] = {}
+        next_up = 0
 
-        elif self.cfg.provider == LLMProvider.ANTHROPIC and self._anthropic_client:
-            try:
-                return await self._call_anthropic(prompt)
-            except Exception as exc:
-                primary_error = exc
-                logger.warning(f"Anthropic call failed: {exc}")
-
-        # Try fallback provider
-        if primary_error:
-            if self.cfg.provider != LLMProvider.ANTHROPIC and self._anthropic_client:
-                try:
-                    logger.info("Falling back to Anthropic...")
-                    return await self._call_anthropic(prompt)
-                except Exception as exc:
-                    logger.warning(f"Anthropic fallback also failed: {exc}")
-            elif self.cfg.provider != LLMProvider.OPENAI and self._openai_client:
-                try:
-                    logger.info("Falling back to OpenAI...")
-                    return await self._call_openai(prompt)
-                except Exception as exc:
-                    logger.warning(f"OpenAI fallback also failed: {exc}")
+        def start_next() -> None:
+            nonlocal next_up
+            provider = chain[next_up]
+            next_up += 1
+            running[asyncio.create_task(self._call_provider(provider, prompt, schema))] = provider
+
+        try:
+            while running or next_up < len(chain):
+                if not running:  # First call, or everything in flight has failed
+                    start_next()
+                done, _ = await asyncio.wait(
+                    running,
+                    timeout=hedge_delay if next_up < len(chain) else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    logger.info("LLM call slow; hedging with %s.", chain[next_up].value)
+                    start_next()
+                    continue
+                winner = None
+                for task in done:
+                    provider = running.pop(task)
+                    if task.exception() is not None:
+                        logger.warning("%s call failed: %r", provider.value, task.exception())
+                    elif winner is None:
+                        winner = task
+                        logger.info("LLM call answered by %s.", provider.value)
+                if winner is not None:
+                    return winner.result()
+        finally:
+            for task in running:
+                task.cancel()
 
         # Last resort: mock
         logger.info("All LLM providers unavailable. Returning mock data.")
-        return json.dumps({"mock": True})
+        return MOCK_PLACEHOLDER
 
-    async def _call_openai(self, prompt: str) -> str:
-        """Call OpenAI Chat Completions API."""
-        if self._openai_client is None:
-            raise RuntimeError("OpenAI client not initialised.")
-        response = await self._openai_client.chat.completions.create(
-            model=self.cfg.openai_model,
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=self.cfg.max_tokens,
-            temperature=self.cfg.temperature,
-            response_format={"type": "json_object"},
-            timeout=self.cfg.timeout_seconds,
+    def _openai_request(self, prompt: str, schema: type[BaseModel] | None) -> dict[str, Any]:
+        """Chat Completions request body (shared by live calls and the Batch API)."""
+        static, dynamic = self._split_prompt(prompt)
+        # OpenAI caches identical prefixes automatically; the preamble leads as the system turn
+        messages = [{"role": "user", "content": dynamic}]
+        if static:
+            messages.insert(0, {"role": "system", "content": static})
+        body: dict[str, Any] = {
+            "model": self.cfg.openai_model,
+            "messages": messages,
+            "max_tokens": self.cfg.max_tokens,
+            "temperature": self.cfg.temperature,
+        }
+        if schema is None:
+            body["response_format"] = {"type": "json_object"}
+        else:
+            body["tools"] = [{
+                "type": "function",
+                "function": {
+                    "name": RESPONSE_TOOL_NAME,
+                    "parameters": schema.model_json_schema(),
+                },
+            }]
+            body["tool_choice"] = {"type": "function", "function": {"name": RESPONSE_TOOL_NAME}}
+        return body
+
+    async def _call_openai(self, prompt: str, schema: type[BaseModel] | None = None) -> str:
+        """Call OpenAI Chat Completions API (tool-calling when given a schema)."""
+        response = await self._openai().chat.completions.create(
+            **self._openai_request(prompt, schema), timeout=self.cfg.timeout_seconds,
         )
-        return response.choices[0].message.content
+        message = response.choices[0].message
+        if schema is None:
+            return message.content
+        return message.tool_calls[0].function.arguments
 
-    async def _call_anthropic(self, prompt: str) -> str:
-        """Call Anthropic Messages API."""
-        if self._anthropic_client is None:
-            raise RuntimeError("Anthropic client not initialised.")
-        response = await self._anthropic_client.messages.create(
-            model=self.cfg.anthropic_model,
-            max_tokens=self.cfg.max_tokens,
-            temperature=self.cfg.temperature,
-            messages=[{"role": "user", "content": prompt}],
+    def _anthropic_request(self, prompt: str, schema: type[BaseModel] | None) -> dict[str, Any]:
+        """Messages API request body (shared by live and streamed calls)."""
+        static, dynamic = self._split_prompt(prompt)
+        content: list[dict[str, Any]] = [{"type": "text", "text": dynamic}]
+        if static:
+            content.insert(0, {
+                "type": "text", "text": static, "cache_control": {"type": "ephemeral"},
+            })
+        body: dict[str, Any] = {
+            "model": self.cfg.anthropic_model,
+            "max_tokens": self.cfg.max_tokens,
+            "temperature": self.cfg.temperature,
+            "messages": [{"role": "user", "content": content}],
+        }
+        if schema is not None:
+            body["tools"] = [{
+                "name": RESPONSE_TOOL_NAME,
+                "input_schema": schema.model_json_schema(),
+            }]
+            body["tool_choice"] = {"type": "tool", "name": RESPONSE_TOOL_NAME}
+        return body
+
+    async def _call_anthropic(self, prompt: str, schema: type[BaseModel] | None = None) -> str:
+        """Call Anthropic Messages API (tool use when given a schema)."""
+        response = await self._anthropic().messages.create(
+            **self._anthropic_request(prompt, schema)
         )
-        return response.content[0].text
-
-    def _parse_json_response(self, raw: str) -> dict[str, Any]:
-        """Parse JSON from LLM response, stripping markdown fences if needed."""
-        stripped = raw.strip()
-        # Handle ```json ... ``` wrapping
-        if stripped.startswith("```"):
-            lines = stripped.split("\n")
-            stripped = "\n".join(lines[1:-1])
-        return json.loads(stripped)
+        if schema is None:
+            return response.content[0].text
+        tool_use = next(block for block in response.content if block.type == "tool_use")
+        return _dumps(tool_use.input).decode()
+
+    @staticmethod
+    def _split_prompt(prompt: str) -> tuple[str, str]:
+        """Split a rendered prompt into (static preamble, variable input)."""
+        static, marker, dynamic = prompt.partition(PROMPT_INPUT_MARKER)
+        if not marker:
+            return "", prompt
+        return static.strip(), marker + dynamic.rstrip()
+
+    def _parse_response(self, template_name: str, raw: str) -> dict[str, Any]:
+        """Validate a provider reply against the template's response schema.
+
+        Raises on malformed or non-conforming output so reason() retries.
+        """
+        schema = TEMPLATE_TO_SCHEMA.get(template_name)
+        if schema is None or raw == MOCK_PLACEHOLDER:
+            return _loads(raw)
+        return schema.model_validate_json(raw).model_dump()
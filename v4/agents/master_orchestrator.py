@@ -192,8 +192,9 @@ class MasterOrchestrator:
             past_outcomes = await self.memory.search(ex.raw_text, n_results=3)
             ex.log_reasoning("OBSERVE_MEMORY", past_outcomes)
 
-            # Call LLM to decompose
-            plan = await self.llm.reason(
+            # Call LLM to decompose, streaming the plan so tasks without
+            # dependencies start while the rest of the plan is generated
+            stream = self.llm.reason_stream(
                 template_name="orchestrator_decompose",
                 variables={
                     "goal": ex.raw_text,
@@ -201,9 +202,26 @@ class MasterOrchestrator:
                 },
                 agent_name="master_orchestrator",
             )
-
+            early_dispatches = []
+            try:
+                async for task in stream:
+                    ex.tasks.append(task)
+                    if not task.get("depends_on"):
+                        ex.status = "running"
+                        early_dispatches.append(
+                            asyncio.create_task(self._dispatch_task(ex, task))
+                        )
+            except BaseException:
+                # A plan that broke off mid-stream is abandoned with its early tasks
+                for dispatch in early_dispatches:
+                    dispatch.cancel()
+                raise
+            finally:
+                await asyncio.gather(*early_dispatches, return_exceptions=True)
+
+            plan = stream.result
             ex.plan = plan
-            ex.tasks = plan.get("tasks", [])
+            ex.tasks = plan.get("tasks", ex.tasks)
             ex.status = "running"
             ex.log_reasoning("ACT", f"Plan created with {len(ex.tasks)} tasks.")
             logger.info(
@@ -346,7 +364,7 @@ class MasterOrchestrator:
     async def _call_scheduler(self, action: str, params: dict) -> dict:
         """Delegate to SchedulerAgent."""
         from .scheduler_agent import SchedulerAgent
-        agent = SchedulerAgent()
+        agent = SchedulerAgent(self.llm, self.memory, self.tools)
         if action == "schedule_job":
             return await agent.schedule_job(**params)
         if action == "get_queue_status":
@@ -356,7 +374,7 @@ class MasterOrchestrator:
     async def _call_cost_optimizer(self, action: str, params: dict) -> dict:
         """Delegate to CostOptimizerAgent."""
         from .cost_optimizer_agent import CostOptimizerAgent
-        agent = CostOptimizerAgent()
+        agent = CostOptimizerAgent(self.llm, self.memory, self.tools)
         if action == "find_cheapest_spot":
             return await agent.find_cheapest_spot(**params)
         if action == "forecast_cost":
@@ -366,7 +384,7 @@ class MasterOrchestrator:
     async def _call_healing(self, action: str, params: dict) -> dict:
         """Delegate to HealingAgent."""
         from .healing_agent import HealingAgent
-        agent = HealingAgent()
+        agent = HealingAgent(self.llm, self.memory, self.tools)
         if action == "monitor_job":
             return await agent.start_monitoring(**params)
         raise ValueError(f"Unknown healing action: {action}")
@@ -374,7 +392,7 @@ class MasterOrchestrator:
     async def _call_forecast(self, action: str, params: dict) -> dict:
         """Delegate to ForecastAgent."""
         from .forecast_agent import ForecastAgent
-        agent = ForecastAgent()
+        agent = ForecastAgent(self.llm, self.memory, self.tools)
         if action == "run_forecast":
             return await agent.run_forecast(**params)
         raise ValueError(f"Unknown forecast action: {action}")
@@ -146,10 +146,15 @@ class SchedulerAgent:
         )
     """
 
-    def __init__(self) -> None:
-        self.llm = LLMReasoningEngine()
-        self.memory = MemoryManager()
-        self.tools = ToolRegistry()
+    def __init__(
+        self,
+        llm: LLMReasoningEngine | None = None,
+        memory: MemoryManager | None = None,
+        tools: ToolRegistry | None = None,
+    ) -> None:
+        self.llm = llm or LLMReasoningEngine()
+        self.memory = memory or MemoryManager()
+        self.tools = tools or ToolRegistry()
         self.governor = get_governor()
 
         self._queue: list[ScheduledJob] = []  # min-heap (inverted priority)
@@ -0,0 +1,30 @@
+"""
+OrQuanta Agentic v1.0 — Smoothing Helpers
+
+Exponential smoothing shared by the cost optimizer (spot prices) and the
+forecast agent (demand rates).
+"""
+
+from __future__ import annotations
+
+import functools
+
+import numpy as np
+
+
+@functools.lru_cache(maxsize=32)
+def _decay_weights(alpha: float, n: int) -> np.ndarray:
+    # Weight of each sample, oldest first: (1-alpha)^(n-1) … (1-alpha)^0
+    weights = (1 - alpha) ** np.arange(n - 1, -1, -1, dtype=np.float64)
+    weights.flags.writeable = False  # Shared between callers through the cache
+    return weights
+
+
+def ewma(values: np.ndarray, alpha: float, init: float) -> float:
+    """Final level of s = alpha*v + (1-alpha)*s over ``values`` (oldest first), from ``init``.
+
+    Unrolled: value i of n carries weight alpha*(1-alpha)^(n-1-i), so the
+    recurrence is one dot product instead of a per-sample Python loop.
+    """
+    n = len(values)
+    return (1 - alpha) ** n * init + alpha * float(_decay_weights(alpha, n) @ values)
@@ -234,6 +234,34 @@ class ToolRegistry:
             "timestamp": datetime.now(timezone.utc).isoformat(),
         }
 
+    async def get_gpu_metrics_many(
+        self, instance_ids: list[str], max_concurrent: int | None = None
+    ) -> dict[str, dict[str, Any]]:
+        """Get GPU telemetry for several instances in one round.
+
+        Args:
+            instance_ids: Instances to query (duplicates are fetched once).
+            max_concurrent: Cap on in-flight metrics calls (None = unbounded),
+                for metrics backends with rate limits.
+
+        Returns:
+            dict mapping instance_id → metrics dict (an ``error`` dict on failure).
+        """
+        ids = list(dict.fromkeys(instance_ids))  # Dedupe, keep order
+        fetch = self.get_gpu_metrics
+        if max_concurrent is not None:
+            slots = asyncio.Semaphore(max_concurrent)
+
+            async def fetch(iid: str) -> dict[str, Any]:
+                async with slots:
+                    return await self.get_gpu_metrics(iid)
+
+        results = await asyncio.gather(*(fetch(iid) for iid in ids), return_exceptions=True)
+        return {
+            iid: {"error": repr(res), "instance_id": iid} if isinstance(res, Exception) else res
+            for iid, res in zip(ids, results)
+        }
+
     # ------------------------------------------------------------------
     # Job Management
     # ------------------------------------------------------------------
@@ -443,6 +471,7 @@ class ToolRegistry:
             {"name": "submit_job",             "description": "Submit a containerized training/inference job to GPU instance"},
             {"name": "get_job_status",         "description": "Get status, progress, and logs for a specific job"},
             {"name": "get_gpu_metrics",        "description": "Get real-time GPU telemetry (utilization, memory, temp)"},
+            {"name": "get_gpu_metrics_many",   "description": "Get GPU telemetry for several instances at once"},
             {"name": "send_alert",             "description": "Send alert to Slack/PagerDuty for warnings or critical events"},
             {"name": "query_memory",           "description": "Semantic search over past agent decisions and outcomes"},
             {"name": "update_memory",          "description": "Persist a new event or decision to vector memory"},
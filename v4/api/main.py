@@ -60,16 +60,19 @@ async def lifespan(app: FastAPI):
     from ..agents.healing_agent import HealingAgent
     from ..agents.forecast_agent import ForecastAgent
 
-    scheduler = SchedulerAgent()
+    # One LLM engine, memory store and tool registry for all agents
+    shared = (orchestrator.llm, orchestrator.memory, orchestrator.tools)
+
+    scheduler = SchedulerAgent(*shared)
     await scheduler.start()
 
-    cost_agent = CostOptimizerAgent()
+    cost_agent = CostOptimizerAgent(*shared)
     await cost_agent.start()
 
-    healing_agent = HealingAgent()
+    healing_agent = HealingAgent(*shared)
     await healing_agent.start()
 
-    forecast_agent = ForecastAgent()
+    forecast_agent = ForecastAgent(*shared)
     await forecast_agent.start()
 
     # Seed a default admin user for first-boot and promote to admin role
@@ -118,6 +121,7 @@ async def lifespan(app: FastAPI):
     await cost_agent.stop()
     await healing_agent.stop()
     await forecast_agent.stop()
+    await orchestrator.llm.close()  # Shared by every agent above
     logger.info("Shutdown complete.")
 
 
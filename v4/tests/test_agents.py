@@ -1,17 +1,39 @@
 """
 OrQuanta Agentic v1.0 — Agent Behavior Tests
-Tests for SchedulerAgent, CostOptimizerAgent, HealingAgent, ForecastAgent
+Tests for SchedulerAgent, CostOptimizerAgent, HealingAgent, ForecastAgent, AuditAgent
 """
 
 import asyncio
+import importlib.util
+import json
 import pytest
 import sys, os
+import time
+from datetime import datetime
+import numpy as np
+from unittest.mock import AsyncMock, MagicMock, patch
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
 
 from v4.agents.scheduler_agent import SchedulerAgent, ScheduledJob, GPUBin
 from v4.agents.cost_optimizer_agent import CostOptimizerAgent
 from v4.agents.healing_agent import HealingAgent, JobHealthRecord
 from v4.agents.forecast_agent import ForecastAgent
+from v4.agents.audit_agent import COPY_MIN_BATCH, AuditAgent, AuditEvent
+from v4.agents import llm_reasoning_engine
+from v4.agents.llm_reasoning_engine import (
+    PROMPT_INPUT_MARKER, PROMPT_TEMPLATES, BreakerState, CircuitBreaker, CircuitOpen,
+    InMemoryCacheBackend, LLMConfig, LLMProvider, LLMReasoningEngine, SemanticLLMCache,
+    _StreamingArrayParser,
+)
+
+
+def _load_without_orjson(module):
+    """A private copy of ``module`` imported as if orjson weren't installed."""
+    spec = importlib.util.spec_from_file_location(f"{module.__name__}_stdlib", module.__file__)
+    copy = importlib.util.module_from_spec(spec)
+    with patch.dict("sys.modules", {"orjson": None, spec.name: copy}):
+        spec.loader.exec_module(copy)
+    return copy
 
 
 # ─── Scheduler Agent ────────────────────────────────────────────────────────
@@ -132,6 +154,22 @@ class TestCostOptimizerAgent:
         assert "smoothed_estimate_usd" in result
         assert result["base_estimate_usd"] == pytest.approx(10.0, abs=0.01)
 
+    @pytest.mark.asyncio
+    async def test_forecast_cost_smooths_recorded_history(self):
+        for price in [1.0, 1.0, 4.0]:
+            self.agent._price_history["avg:H100"].append(price)
+        result = await self.agent.forecast_cost("job-123", "H100", 2.0, 1.0)
+        # s = 2.0 → 1.7 → 1.49 → 2.243
+        assert result["hourly_rate_used"] == pytest.approx(2.243, abs=1e-4)
+
+    def test_provider_comparison_stats(self):
+        for price in [3.0, 1.0, 2.0]:
+            self.agent._price_history["aws:H100"].append(price)
+        [aws] = self.agent.get_provider_comparison("H100")
+        assert (aws["min_price_usd_hr"], aws["max_price_usd_hr"]) == (1.0, 3.0)
+        assert aws["avg_price_usd_hr"] == pytest.approx(2.0)
+        assert aws["samples"] == 3
+
     def test_set_budget(self):
         self.agent.set_budget("job-001", 500.0)
         assert "job-001" in self.agent._budgets
@@ -192,6 +230,141 @@ class TestHealingAgent:
         assert stats["mean"] == pytest.approx(79.0, abs=0.1)
         assert stats["std"] > 0
 
+    @pytest.mark.asyncio
+    async def test_monitoring_cycle_checks_jobs_concurrently(self):
+        async def slow_metrics(instance_id):
+            await asyncio.sleep(0.1)
+            return {"gpu_utilization_pct": 50.0}
+        self.agent.tools.get_gpu_metrics = slow_metrics
+        for i in range(5):
+            await self.agent.start_monitoring(f"job-{i}", f"inst-{i}")
+
+        self.agent._running = True
+        loop_task = asyncio.create_task(self.agent._monitoring_loop())
+        await asyncio.sleep(0.15)  # Serial checks would have finished only one job
+        self.agent._running = False
+        loop_task.cancel()
+        assert all(h["snapshot_count"] == 1 for h in self.agent.get_all_health())
+
+    @pytest.mark.asyncio
+    async def test_monitoring_cycle_fetches_each_instance_once(self):
+        calls = []
+        async def metrics(instance_id):
+            calls.append(instance_id)
+            return {"gpu_utilization_pct": 50.0}
+        self.agent.tools.get_gpu_metrics = metrics
+        for i in range(4):
+            await self.agent.start_monitoring(f"job-{i}", "inst-shared" if i < 3 else "inst-solo")
+
+        self.agent._running = True
+        loop_task = asyncio.create_task(self.agent._monitoring_loop())
+        await asyncio.sleep(0.05)
+        self.agent._running = False
+        loop_task.cancel()
+        assert sorted(calls) == ["inst-shared", "inst-solo"]
+        assert all(h["snapshot_count"] == 1 for h in self.agent.get_all_health())
+
+    @pytest.mark.asyncio
+    async def test_monitoring_metrics_fetch_is_rate_limited(self):
+        in_flight = peak = 0
+        async def metrics(instance_id):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return {"gpu_utilization_pct": 50.0}
+        self.agent.tools.get_gpu_metrics = metrics
+        for i in range(6):
+            await self.agent.start_monitoring(f"job-{i}", f"inst-{i}")
+
+        self.agent._running = True
+        with patch("v4.agents.healing_agent.MAX_PARALLEL_CHECKS", 2):
+            loop_task = asyncio.create_task(self.agent._monitoring_loop())
+            await asyncio.sleep(0.1)
+            self.agent._running = False
+            loop_task.cancel()
+        assert peak == 2
+        assert all(h["snapshot_count"] == 1 for h in self.agent.get_all_health())
+
+    @pytest.mark.asyncio
+    async def test_failed_metrics_round_does_not_stop_monitoring(self):
+        self.agent.tools.get_gpu_metrics_many = AsyncMock(side_effect=RuntimeError("backend down"))
+        await self.agent.start_monitoring("job-f", "inst-f")
+
+        self.agent._running = True
+        with patch("v4.agents.healing_agent.MONITOR_INTERVAL", 0.02):
+            loop_task = asyncio.create_task(self.agent._monitoring_loop())
+            await asyncio.sleep(0.07)
+            assert not loop_task.done()
+            self.agent._running = False
+            loop_task.cancel()
+        assert self.agent.tools.get_gpu_metrics_many.await_count >= 2
+
+    @pytest.mark.asyncio
+    async def test_monitoring_ticks_do_not_drift_with_check_time(self):
+        starts = []
+        async def slow_metrics(instance_id):
+            starts.append(time.monotonic())
+            await asyncio.sleep(0.1)
+            return {"gpu_utilization_pct": 50.0}
+        self.agent.tools.get_gpu_metrics = slow_metrics
+        await self.agent.start_monitoring("job-d", "inst-d")
+
+        self.agent._running = True
+        with patch("v4.agents.healing_agent.MONITOR_INTERVAL", 0.2):
+            loop_task = asyncio.create_task(self.agent._monitoring_loop())
+            await asyncio.sleep(0.3)
+            self.agent._running = False
+            loop_task.cancel()
+        assert len(starts) == 2
+        assert starts[1] - starts[0] == pytest.approx(0.2, abs=0.05)  # Not 0.3
+
+    def test_rolling_stats_follow_window_eviction(self):
+        record = JobHealthRecord("job-x", "inst-x")
+        values = [float(v % 17) * 3.5 for v in range(75)]
+        for val in values:
+            record.record_metrics({"gpu_utilization_pct": val})
+        window = values[-60:]
+        mean = sum(window) / 60
+        std = (sum((v - mean) ** 2 for v in window) / 59) ** 0.5
+        stats = record.get_rolling_stats("gpu_utilization_pct")
+        assert stats["n"] == 60
+        assert stats["mean"] == pytest.approx(mean)
+        assert stats["std"] == pytest.approx(std)
+        assert [snap["gpu_utilization_pct"] for snap in record.snapshots()] == window
+
+    def test_quantized_history_keeps_reported_precision(self):
+        record = JobHealthRecord("job-q", "inst-q")
+        utils = [round(65.0 + (i * 7.3) % 33, 1) for i in range(40)]
+        for util in utils:
+            record.record_metrics({"gpu_utilization_pct": util, "power_watts": 3199.9,
+                                   "memory_used_gb": 39.87})
+        record.record_metrics({"gpu_utilization_pct": utils[-1], "memory_used_gb": 1127.99})
+        snaps = record.snapshots()
+        assert [snap["gpu_utilization_pct"] for snap in snaps[:-1]] == utils
+        assert snaps[0]["power_watts"] == 3199.9
+        assert snaps[0]["memory_used_gb"] == 39.87  # Reported to 2 decimals
+        assert snaps[-1]["memory_used_gb"] == 1127.99 and "power_watts" not in snaps[-1]
+        utils.append(utils[-1])
+        mean = sum(utils) / len(utils)
+        std = (sum((u - mean) ** 2 for u in utils) / (len(utils) - 1)) ** 0.5
+        stats = record.get_rolling_stats("gpu_utilization_pct")
+        assert stats["mean"] == pytest.approx(mean, abs=1e-9)
+        assert stats["std"] == pytest.approx(std, abs=1e-9)
+
+    @pytest.mark.asyncio
+    async def test_repeated_utilization_spikes_trigger_anomaly_heal(self):
+        self.agent._heal_anomaly = AsyncMock()
+        record = JobHealthRecord("job-z", "inst-z")
+        for i in range(50):
+            await self.agent._check_job(record, {"gpu_utilization_pct": 50.0 + (i % 3)})
+        for _ in range(3):
+            await self.agent._check_job(record, {"gpu_utilization_pct": 99.0})
+        assert record.anomaly_count == 3
+        z_score = self.agent._heal_anomaly.await_args.args[2]
+        assert z_score > 3.0
+
     def test_get_all_health(self):
         asyncio.get_event_loop().run_until_complete(self.agent.start_monitoring("j1", "i1"))
         asyncio.get_event_loop().run_until_complete(self.agent.start_monitoring("j2", "i2"))
@@ -205,6 +378,13 @@ class TestForecastAgent:
     def setup_method(self):
         self.agent = ForecastAgent()
 
+    def test_shares_injected_dependencies(self):
+        llm = LLMReasoningEngine(LLMConfig(provider=LLMProvider.MOCK))
+        forecast = ForecastAgent(llm=llm)
+        healer = HealingAgent(llm, forecast.memory, forecast.tools)
+        assert healer.llm is forecast.llm is llm
+        assert healer.memory is forecast.memory and healer.tools is forecast.tools
+
     def test_record_job_submission(self):
         self.agent.record_job_submission("H100")
         assert self.agent._current_utilization["H100"] == 1
@@ -230,6 +410,15 @@ class TestForecastAgent:
         assert "recommendation" in result
         assert result["recommendation"] in ["pre-provision", "hold", "scale-down"]
 
+    def test_statistical_forecast_splits_by_gpu(self):
+        for gpu in ["H100"] * 1500 + ["T4"] * 500 + ["A10G"] * 10:
+            self.agent.record_job_submission(gpu)
+        assert self.agent._n == 2010  # Grew past the initial 1024 slots
+        forecast = self.agent._statistical_forecast(window_hours=24)
+        per_gpu = forecast["per_gpu"]
+        assert per_gpu["H100"] == pytest.approx(3 * per_gpu["T4"], rel=0.05)
+        assert per_gpu["A100"] == 1
+
     def test_get_last_forecast_empty(self):
         result = self.agent.get_last_forecast()
         assert result.get("status") == "no_forecast_yet" or isinstance(result, dict)
@@ -241,9 +430,612 @@ class TestForecastAgent:
         assert len(chart["hourly_demand"]) == 24
         assert "peak_hour_utc" in chart
 
+    def test_hourly_demand_chart_peak(self):
+        assert self.agent.get_hourly_demand_chart("A100")["peak_hour_utc"] == 0
+        self.agent._hourly_demand["A100"][[3, 7, 9]] = [4, 6, 6]
+        chart = self.agent.get_hourly_demand_chart("A100")
+        assert (chart["peak_hour_utc"], chart["peak_count"]) == (7, 6)  # First of tied peaks
+        assert chart["hourly_demand"][3] == 4
+
     def test_get_utilization(self):
         self.agent.record_job_submission("H100")
         self.agent.record_job_submission("T4")
         util = self.agent.get_utilization()
         assert util["active_jobs_by_gpu"]["H100"] >= 1
         assert util["total_active_jobs"] >= 2
+
+    def test_utilization_total_tracks_completions(self):
+        self.agent.record_job_submission("H100")
+        self.agent.record_job_submission("H100")
+        self.agent.record_job_completion("H100")
+        self.agent.record_job_completion("T4")  # Already zero; must not go negative
+        util = self.agent.get_utilization()
+        assert util["total_active_jobs"] == sum(util["active_jobs_by_gpu"].values()) == 1
+        self.agent.record_job_submission("H100")
+        assert util["active_jobs_by_gpu"]["H100"] == 1  # Snapshot, not a live view
+        assert json.loads(json.dumps(util)) == util  # Plain JSON for the metrics route
+
+
+# ─── Audit Agent ───────────────────────────────────────────────────────────
+
+class TestAuditAgent:
+    def setup_method(self):
+        self.agent = AuditAgent()
+
+    def test_event_ids_unique_and_ordered(self):
+        ids = [self.agent.log_sync(AuditEvent(action="x", actor_id="u1")) for _ in range(3)]
+        assert len(set(ids)) == 3
+        assert [int(i.rsplit("-", 1)[1], 16) for i in ids] == [0, 1, 2]
+
+    def test_timestamp_formatted_once_per_second(self):
+        with patch("v4.agents.audit_agent.time.time", return_value=1_700_000_000.7):
+            first = self.agent._now_iso()
+            assert self.agent._now_iso() is first
+        assert first == "2023-11-14T22:13:20+00:00"
+
+    def _mock_pool(self):
+        conn = MagicMock()
+        conn.copy_records_to_table = AsyncMock()
+        conn.executemany = AsyncMock()
+        pool = MagicMock()
+        pool.acquire.return_value.__aenter__ = AsyncMock(return_value=conn)
+        pool.acquire.return_value.__aexit__ = AsyncMock(return_value=False)
+        self.agent._pool = pool
+        return conn
+
+    @pytest.mark.asyncio
+    async def test_flush_batch_writes_one_copy(self):
+        conn = self._mock_pool()
+        for i in range(COPY_MIN_BATCH):
+            self.agent.log_sync(AuditEvent(action="goal_submitted", actor_id=f"usr-{i}"))
+        await self.agent._flush_batch()
+
+        conn.copy_records_to_table.assert_awaited_once()
+        conn.executemany.assert_not_awaited()
+        records = conn.copy_records_to_table.await_args.kwargs["records"]
+        assert [r[0] for r in records[:3]] == ["usr-0", "usr-1", "usr-2"]
+        assert self.agent.get_stats()["events_pending_persist"] == 0
+
+    @pytest.mark.asyncio
+    async def test_small_flush_uses_executemany(self):
+        conn = self._mock_pool()
+        for i in range(3):
+            self.agent.log_sync(AuditEvent(action="goal_submitted", actor_id=f"usr-{i}"))
+        await self.agent._flush_batch()
+
+        conn.copy_records_to_table.assert_not_awaited()
+        _, records = conn.executemany.await_args.args
+        assert [r[0] for r in records] == ["usr-0", "usr-1", "usr-2"]
+
+    def test_history_index_follows_ring_eviction(self):
+        from collections import deque
+        self.agent._events = deque(maxlen=3)
+        for actor in ["usr-a", "usr-b", "usr-a", "usr-a"]:
+            self.agent.log_sync(AuditEvent(action="goal_submitted", actor_id=actor, org_id="org-1"))
+        assert len(self.agent.get_history(actor_id="usr-a")) == 2  # Oldest usr-a evicted
+        assert len(self.agent.get_history(org_id="org-1")) == 3
+        assert len(self.agent.export_user_data("usr-b")) == 1
+
+    def test_history_combined_filters(self):
+        for actor, org, res in [("u1", "o1", "r1"), ("u2", "o1", "r2"), ("u1", "o2", "r1")]:
+            self.agent.log_sync(AuditEvent(action="goal_submitted", actor_id=actor, org_id=org, resource_id=res))
+        assert len(self.agent.get_history()) == 3
+        assert [e["org_id"] for e in self.agent.get_history(actor_id="u1", org_id="o2")] == ["o2"]
+        assert [e["actor_id"] for e in self.agent.get_history(org_id="o1", resource_id="r2")] == ["u2"]
+        assert len(self.agent.get_history(resource_id="r1", action="goal")) == 2
+        assert self.agent.get_history(action="login") == []
+
+    def test_history_since_hours_cutoff(self):
+        old = "2020-01-01T00:00:00+00:00"
+        self.agent.log_sync(AuditEvent(action="goal_submitted", actor_id="u1", timestamp=old))
+        self.agent.log_sync(AuditEvent(action="goal_submitted", actor_id="u1"))
+        assert len(self.agent.get_history()) == 1
+        assert len(self.agent.get_history(actor_id="u1")) == 1
+        assert self.agent.get_history(since_hours=24 * 365 * 20)[-1]["timestamp"] == old
+
+    def test_since_hours_cutoff_with_out_of_order_timestamps_and_eviction(self):
+        from collections import deque
+        self.agent._events = deque(maxlen=3)
+        old = "2020-01-01T00:00:00+00:00"
+        stamps = ["", old, "", "", old, ""]  # Old ones arrive after recent ones
+        for i, stamp in enumerate(stamps):
+            self.agent.log_sync(AuditEvent(action="goal_submitted", actor_id=f"u{i}", timestamp=stamp))
+        assert self.agent._ts_head < 3  # Trimmed once a ring-length was evicted
+        assert len(self.agent._timestamps) - self.agent._ts_head == 3
+        # The late old event sorts with its predecessor, so none is cut off wrongly
+        assert [e["actor_id"] for e in self.agent.get_history()] == ["u5", "u4", "u3"]
+
+    def test_non_iso_timestamp_is_replaced_not_raised(self):
+        self.agent.log_sync(AuditEvent(action="goal_submitted", actor_id="u1", timestamp="yesterday"))
+        assert len(self.agent._events) == len(self.agent._timestamps) == 1
+        event = self.agent.get_history()[0]
+        assert event["metadata"]["client_timestamp"] == "yesterday"
+        assert datetime.fromisoformat(event["timestamp"])
+
+    def test_persist_queue_drops_oldest_when_full(self):
+        self.agent._pending_persist = asyncio.Queue(maxsize=2)
+        for i in range(3):
+            self.agent.log_sync(AuditEvent(action="goal_submitted", actor_id=f"usr-{i}"))
+        assert self.agent.get_stats()["events_dropped_persist"] == 1
+        assert self.agent._pending_persist.get_nowait().actor_id == "usr-1"
+        assert len(self.agent._events) == 3
+
+    def test_wide_integers_in_metadata_are_hashed_not_raised(self):
+        self.agent.log_sync(AuditEvent(action="goal_submitted", actor_id="usr-1",
+                                       metadata={"bytes": 2**70, "ids": [-(2**65), 1]}))
+        event = self.agent.get_history()[0]
+        assert event["metadata"]["bytes"] == 2**70  # Stored as given
+        signed = {k: v for k, v in event.items() if k not in ("signature", "batch")}
+        assert self.agent._content_hash(signed) == event["signature"] != ""
+        signed["metadata"] = {**signed["metadata"], "bytes": 2**70 + 1}
+        assert self.agent._content_hash(signed) != event["signature"]
+
+    def test_signature_detects_tampering(self):
+        self.agent.log_sync(AuditEvent(action="goal_submitted", actor_id="usr-1", metadata={"b": 1, "a": 2}))
+        events = self.agent.get_history(actor_id="usr-1")
+        batch_sig = self.agent._sign_batch([events[0]["signature"]], "genesis")
+        assert self.agent.verify_batch_integrity(events, batch_sig, "genesis")
+        events[0]["result"] = "failed"
+        assert not self.agent.verify_batch_integrity(events, batch_sig, "genesis")
+        # Re-hashing the edited event doesn't help without the batch key
+        events[0]["signature"] = self.agent._content_hash(
+            {k: v for k, v in events[0].items() if k not in ("signature", "batch")}
+        )
+        assert not self.agent.verify_batch_integrity(events, batch_sig, "genesis")
+
+    @pytest.mark.asyncio
+    async def test_batch_signature_chains(self):
+        for i in range(3):
+            self.agent.log_sync(AuditEvent(action="goal_submitted", actor_id=f"usr-{i}"))
+        await self.agent._flush_batch()
+        batch = self.agent.get_history()[::-1]  # Flush order
+        batch_sig = self.agent._last_batch_signature
+        assert batch[0]["batch"] == {"seq": 1, "index": 0, "signature": batch_sig, "previous": "genesis"}
+        assert self.agent.verify_batch_integrity(batch, batch_sig, "genesis")
+        assert not self.agent.verify_batch_integrity(batch[:2], batch_sig, "genesis")
+        assert not self.agent.verify_batch_integrity(batch + batch[-1:], batch_sig, "genesis")
+        assert not self.agent.verify_batch_integrity(batch, batch_sig, "other")
+
+    @pytest.mark.asyncio
+    async def test_persisted_rows_carry_batch_chain(self):
+        conn = self._mock_pool()
+        for flush in range(2):
+            for i in range(3):
+                self.agent.log_sync(AuditEvent(action="goal_submitted", actor_id=f"usr-{flush}-{i}"))
+            await self.agent._flush_batch()
+        rows = [json.loads(r[3]) for call in conn.executemany.await_args_list for r in call.args[1]]
+        batches: dict[str, list] = {}
+        for row in rows:
+            batches.setdefault(row["batch"]["signature"], []).append(row)
+        first, second = (sorted(b, key=lambda r: r["batch"]["index"]) for b in batches.values())
+        assert second[0]["batch"]["previous"] == first[0]["batch"]["signature"]
+        for members in (first, second):
+            link = members[0]["batch"]
+            assert self.agent.verify_batch_integrity(members, link["signature"], link["previous"])
+
+
+# ─── LLM Reasoning Engine ──────────────────────────────────────────────────
+
+class TestLLMReasoningEngine:
+    def setup_method(self):
+        self.engine = LLMReasoningEngine(LLMConfig(provider=LLMProvider.MOCK))
+
+    def _stub_call_llm(self, call):
+        # A MOCK engine never reaches _call_llm, so pose as a live provider
+        self.engine.cfg.provider = LLMProvider.OPENAI
+        self.engine._call_llm = call
+
+    @pytest.mark.asyncio
+    async def test_reason_caps_concurrent_provider_calls(self):
+        in_flight = peak = 0
+        async def slow_call(prompt, schema=None):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return '{"priority_score": 0.5, "reasoning": "ok"}'
+        self._stub_call_llm(slow_call)
+        with patch.object(llm_reasoning_engine, "LLM_SEM", asyncio.Semaphore(2)):
+            results = await asyncio.gather(
+                *(self.engine.reason("scheduler_score", {}) for _ in range(6))
+            )
+        assert results == [{"priority_score": 0.5, "reasoning": "ok"}] * 6
+        assert peak == 2
+
+    @pytest.mark.asyncio
+    async def test_reason_serves_repeat_requests_from_cache(self):
+        calls = []
+        async def call(prompt, schema=None):
+            calls.append(prompt)
+            return '{"priority_score": 0.5, "reasoning": "ok"}'
+        self._stub_call_llm(call)
+        first = await self.engine.reason("scheduler_score", {"job_json": {"id": 1}}, cacheable=True)
+        first["priority_score"] = 0.0  # Hits must not alias the cached value
+        second = await self.engine.reason("scheduler_score", {"job_json": {"id": 1}}, cacheable=True)
+        await self.engine.reason("scheduler_score", {"job_json": {"id": 2}}, cacheable=True)
+        await self.engine.reason("scheduler_score", {"job_json": {"id": 1}})  # temperature 0.2
+        assert second == {"priority_score": 0.5, "reasoning": "ok"}
+        assert len(calls) == 3
+        assert (self.engine.stats["cache_hits"], self.engine.stats["cache_misses"]) == (1, 2)
+
+    @pytest.mark.asyncio
+    async def test_in_memory_cache_expires_and_evicts(self):
+        now = [0.0]
+        backend = InMemoryCacheBackend(max_entries=2, clock=lambda: now[0])
+        await backend.set("a", "1", ttl=10)
+        await backend.set("b", "2", ttl=10)
+        assert await backend.get("a") == "1"  # Now most recently used
+        await backend.set("c", "3", ttl=10)
+        assert await backend.get("b") is None
+        now[0] = 10.0
+        assert await backend.get("a") is None
+
+    @pytest.mark.asyncio
+    async def test_semantic_cache_matches_near_duplicates_per_template(self):
+        async def embed(text):
+            # Toy embedding: "GPU" and "accelerator" phrasing land on the same axis
+            return np.array([text.count("GPU") + text.count("accelerator"), text.count("CPU"), 0.1])
+        cache = SemanticLLMCache(embed, threshold=0.95)
+        stored = await cache.embed("Need a GPU\n  for   training")
+        cache.set("healing_diagnose", stored, {"action": "scale_up"})
+        near = await cache.embed("Need an accelerator for training")
+        assert cache.get("healing_diagnose", near) == {"action": "scale_up"}
+        assert cache.get("cost_optimize", near) is None  # Other template namespace
+        assert cache.get("healing_diagnose", await cache.embed("Need a CPU")) is None
+
+    def test_templates_keep_variables_after_static_prefix(self):
+        for name, template in PROMPT_TEMPLATES.items():
+            static, marker, dynamic = template.partition(PROMPT_INPUT_MARKER)
+            assert marker, name
+            assert "$" not in static and "$" in dynamic, name
+        prompt = self.engine._render_template("scheduler_score", {"job_json": {"id": 7}})
+        static, dynamic = self.engine._split_prompt(prompt)
+        assert static.startswith("You are the SchedulerAgent")
+        assert dynamic.startswith(PROMPT_INPUT_MARKER) and '"id": 7' in dynamic
+
+    @pytest.mark.asyncio
+    async def test_openai_replies_through_forced_tool_call(self):
+        tool_call = MagicMock()
+        tool_call.function.arguments = '{"priority_score": 0.7, "reasoning": "deadline"}'
+        response = MagicMock()
+        response.choices[0].message.tool_calls = [tool_call]
+        client = MagicMock()
+        client.chat.completions.create = AsyncMock(return_value=response)
+        self.engine._openai_client = client
+        self.engine.cfg.provider = LLMProvider.OPENAI
+
+        result = await self.engine.reason("scheduler_score", {"job_json": {}})
+        assert result == {"priority_score": 0.7, "reasoning": "deadline"}
+        kwargs = client.chat.completions.create.await_args.kwargs
+        assert kwargs["tool_choice"]["function"]["name"] == "respond"
+        assert "priority_score" in kwargs["tools"][0]["function"]["parameters"]["properties"]
+
+    def test_parse_response_rejects_off_schema_replies(self):
+        with pytest.raises(ValueError):
+            self.engine._parse_response("healing_diagnose", '{"diagnosis": "x", "action": "reboot"}')
+        assert self.engine._parse_response("healing_diagnose", '{"mock": true}') == {"mock": True}
+
+    @pytest.mark.asyncio
+    async def test_retry_backoff_yields_to_event_loop(self):
+        replies = iter(["not json", "not json", '{"priority_score": 0.4, "reasoning": "ok"}'])
+        async def flaky(prompt, schema=None):
+            return next(replies)
+        self._stub_call_llm(flaky)
+        self.engine.cfg.max_backoff_seconds = 3.0
+        with patch("v4.agents.llm_reasoning_engine.asyncio.sleep", new=AsyncMock()) as sleep:
+            result = await self.engine.reason("scheduler_score", {})
+        assert result["priority_score"] == 0.4
+        first, second = (call.args[0] for call in sleep.await_args_list)
+        assert 2 <= first < 3 and 3 <= second < 4  # 2**2 capped at 3
+
+    def _two_providers(self, openai_call, anthropic_call):
+        self.engine._openai_client = self.engine._anthropic_client = object()
+        self.engine.cfg.provider = LLMProvider.OPENAI
+        self.engine._call_openai = openai_call
+        self.engine._call_anthropic = anthropic_call
+
+    @pytest.mark.asyncio
+    async def test_slow_primary_is_hedged_by_fallback(self):
+        cancelled = []
+        async def slow_openai(prompt, schema=None):
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+            return "openai"
+        async def fast_anthropic(prompt, schema=None):
+            return "anthropic"
+        self._two_providers(slow_openai, fast_anthropic)
+        self.engine.cfg.hedge_delay_ms = 20
+        assert await self.engine._call_llm("p") == "anthropic"
+        await asyncio.sleep(0.01)  # Let the cancellation reach the slow call
+        assert cancelled == [True]
+
+    @pytest.mark.asyncio
+    async def test_failed_primary_falls_back_without_hedge_delay(self):
+        async def broken_openai(prompt, schema=None):
+            raise RuntimeError("503")
+        async def anthropic(prompt, schema=None):
+            return "anthropic"
+        self._two_providers(broken_openai, anthropic)
+        self.engine.cfg.hedge_delay_ms = 60_000
+        assert await asyncio.wait_for(self.engine._call_llm("p"), 1) == "anthropic"
+        async def broken_anthropic(prompt, schema=None):
+            raise RuntimeError("overloaded")
+        self.engine._call_anthropic = broken_anthropic
+        assert await self.engine._call_llm("p") == '{"mock": true}'
+
+    @pytest.mark.asyncio
+    async def test_reason_batch_keeps_input_order(self):
+        async def call(prompt, schema=None):
+            job_id = int(prompt.split('"id": ')[1].split()[0])
+            await asyncio.sleep(0.01 * (3 - job_id))  # Later jobs finish first
+            return f'{{"priority_score": 0.{job_id}, "reasoning": "ok"}}'
+        self._stub_call_llm(call)
+        results = await self.engine.reason_batch(
+            "scheduler_score", [{"job_json": {"id": i}} for i in range(3)]
+        )
+        assert [r["priority_score"] for r in results] == [0.0, 0.1, 0.2]
+
+    @pytest.mark.asyncio
+    async def test_reason_batch_uses_openai_batch_api(self):
+        n = llm_reasoning_engine.BATCH_API_MIN_SIZE + 1
+        def reply(i):
+            args = json.dumps({"priority_score": i / 100, "reasoning": "ok"})
+            message = {"tool_calls": [{"function": {"arguments": args}}]}
+            return json.dumps({"custom_id": str(i), "response": {"body": {"choices": [{"message": message}]}}})
+        client = MagicMock()
+        client.files.create = AsyncMock(return_value=MagicMock(id="file-in"))
+        client.batches.create = AsyncMock(
+            return_value=MagicMock(id="batch-1", status="completed", output_file_id="file-out")
+        )
+        client.files.content = AsyncMock(
+            return_value=MagicMock(text="\n".join(reply(i) for i in range(n - 1)))
+        )
+        self.engine._openai_client = client
+        self.engine.cfg.provider = LLMProvider.OPENAI
+        self.engine.reason = AsyncMock(return_value={"priority_score": 0.99, "reasoning": "live"})
+
+        results = await self.engine.reason_batch(
+            "scheduler_score", [{"job_json": {"id": i}} for i in range(n)], use_batch_api=True
+        )
+        assert [r["priority_score"] for r in results[:3]] == [0.0, 0.01, 0.02]
+        assert results[-1]["reasoning"] == "live"  # Missing from the batch output
+        assert self.engine.reason.await_count == 1
+        upload = client.files.create.await_args.kwargs["file"][1].decode().splitlines()
+        assert len(upload) == n and json.loads(upload[0])["url"] == "/v1/chat/completions"
+
+    def test_render_skips_variables_the_template_never_uses(self):
+        class Unencodable:
+            def __str__(self):
+                raise AssertionError("unused variable was encoded")
+        prompt = self.engine._render_template(
+            "orchestrator_decompose", {"goal": "Train BERT", "past_context": Unencodable()}
+        )
+        assert 'GOAL (from user): "Train BERT"' in prompt
+        with pytest.raises(ValueError):
+            self.engine._render_template("no_such_template", {})
+
+    def test_render_reuses_prompt_for_identical_variables(self):
+        variables = {"job_id": "j-1", "metrics_json": {"temp": 91, "util": 40}, "error_log": ""}
+        first = self.engine._render_template("healing_diagnose", variables)
+        reordered = {"error_log": "", "metrics_json": {"util": 40, "temp": 91}, "job_id": "j-1"}
+        assert self.engine._render_template("healing_diagnose", reordered) is first
+        variables["metrics_json"]["temp"] = 92
+        assert '"temp": 92' in self.engine._render_template("healing_diagnose", variables)
+        assert len(self.engine._render_cache) == 2
+
+    @pytest.mark.asyncio
+    async def test_provider_clients_share_one_http_pool(self):
+        http_client = self.engine._shared_http_client()
+        assert self.engine._shared_http_client() is http_client
+        await self.engine.close()
+        assert http_client.is_closed and self.engine._http_client is None
+
+    def test_streaming_parser_emits_items_as_they_close(self):
+        parser = _StreamingArrayParser("tasks")
+        text = ('{"reasoning": "tasks: [\\"x\\"] {", "tasks": [{"task_id": "a", "parameters": {"n": [1]}},'
+                ' {"task_id": "b}"}], "other": [{"task_id": "z"}]}')
+        emitted = [(i, item["task_id"]) for i in range(len(text)) for item in parser.feed(text[i])]
+        assert [task_id for _, task_id in emitted] == ["a", "b}"]
+        assert text[emitted[0][0]] == "}" and emitted[0][0] < text.index('"b}"')
+        assert parser.text == text
+
+    @pytest.mark.asyncio
+    async def test_reason_stream_yields_tasks_before_reply_finishes(self):
+        plan = {
+            "reasoning": "r",
+            "tasks": [{"task_id": f"t{i}", "agent": "scheduler_agent", "action": "schedule_job"}
+                      for i in range(2)],
+            "estimated_cost_usd": 1.0,
+            "estimated_duration_minutes": 5,
+        }
+        raw = json.dumps(plan)
+        sent = []
+        async def fragments():
+            for i in range(0, len(raw), 7):
+                sent.append(i)
+                chunk = MagicMock()
+                chunk.choices[0].delta.tool_calls[0].function.arguments = raw[i:i + 7]
+                yield chunk
+        client = MagicMock()
+        client.chat.completions.create = AsyncMock(return_value=fragments())
+        self.engine._openai_client = client
+        self.engine.cfg.provider = LLMProvider.OPENAI
+
+        stream = self.engine.reason_stream("orchestrator_decompose", {"goal": "g"})
+        seen_at = []
+        async for task in stream:
+            seen_at.append((task["task_id"], len(sent)))
+        assert [task_id for task_id, _ in seen_at] == ["t0", "t1"]
+        assert seen_at[0][1] < len(range(0, len(raw), 7))  # First task before the last chunk
+        assert stream.result["tasks"][1]["depends_on"] == []
+        assert client.chat.completions.create.await_args.kwargs["stream"] is True
+
+    @pytest.mark.asyncio
+    async def test_reason_stream_validates_items_and_reuses_cache(self):
+        plan = {"reasoning": "r", "tasks": [{"task_id": "t0", "agent": "scheduler_agent",
+                                            "action": "schedule_job"}],
+                "estimated_cost_usd": 1.0, "estimated_duration_minutes": 5}
+        async def fragments():
+            chunk = MagicMock()
+            chunk.choices[0].delta.tool_calls[0].function.arguments = json.dumps(plan)
+            yield chunk
+        client = MagicMock()
+        client.chat.completions.create = AsyncMock(side_effect=lambda **_: fragments())
+        self.engine._openai_client = client
+        self.engine.cfg.provider = LLMProvider.OPENAI
+        self.engine.cfg.temperature = 0
+
+        first = [task async for task in self.engine.reason_stream("orchestrator_decompose", {})]
+        assert first[0]["depends_on"] == [] and first[0]["priority"] == 5  # Schema defaults
+        stream = self.engine.reason_stream("orchestrator_decompose", {})
+        assert [task async for task in stream] == first
+        assert client.chat.completions.create.await_count == 1
+        assert self.engine.stats["cache_hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_reason_stream_falls_back_to_reason_without_provider(self):
+        stream = self.engine.reason_stream("orchestrator_decompose", {"goal": "g"})
+        tasks = [task async for task in stream]
+        assert [t["task_id"] for t in tasks] == ["t-001", "t-002", "t-003"]
+        assert stream.result["tasks"] == tasks
+
+    @pytest.mark.asyncio
+    async def test_mock_provider_skips_rendering_and_provider_calls(self):
+        self.engine._render_template = MagicMock(side_effect=AssertionError("rendered"))
+        self.engine._call_llm = AsyncMock(side_effect=AssertionError("called"))
+        plan = await self.engine.reason("orchestrator_decompose", {"goal": "g"})
+        assert plan == llm_reasoning_engine.MOCK_RESPONSES["orchestrator_decompose"]
+        assert self.engine.stats["cache_misses"] == 0
+
+    @pytest.mark.asyncio
+    async def test_mock_fallback_returns_private_copies(self):
+        async def broken(prompt, schema=None):
+            raise RuntimeError("down")
+        self._stub_call_llm(broken)
+        self.engine.cfg.max_retries = 1
+        first = await self.engine.reason("orchestrator_decompose", {})
+        first["tasks"][0]["priority"] = 0
+        second = await self.engine.reason("orchestrator_decompose", {})
+        assert second["tasks"][0]["priority"] == 8
+        assert llm_reasoning_engine._mock_for("unknown_template") == {"error": "llm_unavailable"}
+        with pytest.raises(TypeError):
+            llm_reasoning_engine.MOCK_RESPONSES["scheduler_score"] = {}
+
+    def test_provider_sdk_is_imported_on_first_call_only(self):
+        sdk = MagicMock()
+        installed = {"openai": object()}
+        with patch.object(llm_reasoning_engine.importlib.util, "find_spec", new=installed.get), \
+                patch.dict("sys.modules", {"openai": sdk}):
+            engine = LLMReasoningEngine(LLMConfig(
+                provider=LLMProvider.AUTO, openai_api_key="k", anthropic_api_key=""
+            ))
+            assert engine.cfg.provider == LLMProvider.OPENAI
+            assert engine._provider_chain() == [LLMProvider.OPENAI]
+            sdk.AsyncOpenAI.assert_not_called()
+            assert engine._openai() is engine._openai() is sdk.AsyncOpenAI.return_value
+        sdk.AsyncOpenAI.assert_called_once()
+
+    def test_missing_sdk_falls_back_without_importing(self):
+        with patch.object(llm_reasoning_engine.importlib.util, "find_spec", return_value=None):
+            engine = LLMReasoningEngine(LLMConfig(provider=LLMProvider.OPENAI, openai_api_key="k"))
+        assert engine.cfg.provider == LLMProvider.MOCK
+        with pytest.raises(RuntimeError):
+            engine._openai()
+
+    def test_circuit_breaker_opens_then_probes_after_timeout(self):
+        now = [0.0]
+        breaker = CircuitBreaker(fail_threshold=2, reset_timeout=30, clock=lambda: now[0])
+        breaker.record_failure()
+        breaker.check()  # One failure is below the threshold
+        breaker.record_failure()
+        assert breaker.state == BreakerState.OPEN
+        with pytest.raises(CircuitOpen):
+            breaker.check()
+        now[0] = 30.0
+        assert breaker.state == BreakerState.HALF_OPEN
+        breaker.record_failure()  # Failed probe re-opens immediately
+        assert breaker.state == BreakerState.OPEN
+        now[0] = 60.0
+        breaker.record_success()
+        assert breaker.state == BreakerState.CLOSED and breaker.failures == 0
+
+    def test_stdlib_json_fallback_matches_orjson(self):
+        stdlib = _load_without_orjson(llm_reasoning_engine)
+        assert stdlib._dumps is not llm_reasoning_engine._dumps
+        variables = {"metrics_json": [{"t": 1, "gpu_util": 97.5}], "hours": {3: "peak é"}}
+        for kwargs in ({}, {"indent": True}, {"sort_keys": True}):
+            assert stdlib._dumps(variables, **kwargs) == llm_reasoning_engine._dumps(
+                variables, **kwargs)
+        assert stdlib._loads('{"a": [1, 2.5]}') == {"a": [1, 2.5]}
+
+    @pytest.mark.asyncio
+    async def test_half_open_circuit_admits_a_single_probe(self):
+        gate = asyncio.Event()
+        calls = []
+        async def slow_openai(prompt, schema=None):
+            calls.append(prompt)
+            await gate.wait()
+            return "ok"
+        self.engine._call_openai = slow_openai
+        breaker = self.engine._breaker(LLMProvider.OPENAI)
+        breaker.opened_at, breaker.failures = -1e9, 5  # Reset timeout long passed
+        assert breaker.state == BreakerState.HALF_OPEN
+
+        probe = asyncio.create_task(self.engine._call_provider(LLMProvider.OPENAI, "p", None))
+        await asyncio.sleep(0)
+        assert breaker.state == BreakerState.OPEN
+        with pytest.raises(CircuitOpen, match="probe"):
+            await self.engine._call_provider(LLMProvider.OPENAI, "q", None)
+        probe.cancel()  # A cancelled probe frees the slot without an outcome
+        await asyncio.gather(probe, return_exceptions=True)
+        assert breaker.state == BreakerState.HALF_OPEN
+
+        gate.set()
+        assert await self.engine._call_provider(LLMProvider.OPENAI, "r", None) == "ok"
+        assert calls == ["p", "r"]
+        assert breaker.state == BreakerState.CLOSED
+
+    @pytest.mark.asyncio
+    async def test_open_circuit_skips_provider_without_calling_it(self):
+        openai_calls = []
+        async def broken_openai(prompt, schema=None):
+            openai_calls.append(prompt)
+            raise RuntimeError("503")
+        async def anthropic(prompt, schema=None):
+            return "anthropic"
+        self._two_providers(broken_openai, anthropic)
+        self.engine.cfg.breaker_fail_threshold = 2
+        for _ in range(3):
+            assert await self.engine._call_llm("p") == "anthropic"
+        assert len(openai_calls) == 2
+        assert self.engine._breaker(LLMProvider.OPENAI).state == BreakerState.OPEN
+        assert self.engine._breaker(LLMProvider.ANTHROPIC).state == BreakerState.CLOSED
+
+    @pytest.mark.asyncio
+    async def test_oversized_prompt_trimmed_before_sending(self):
+        prompts = []
+        async def openai(prompt, schema=None):
+            prompts.append(prompt)
+            return json.dumps(llm_reasoning_engine.MOCK_RESPONSES["healing_diagnose"])
+        self._two_providers(openai, openai)
+        self.engine.cfg.openai_model = "tiny"
+        base = len(self.engine._render_template("healing_diagnose", {"metrics_json": []}))
+        limit = self.engine.cfg.max_tokens + base // 4 + 200
+        metrics = [{"t": i, "gpu_util": 97.5, "mem_used_gb": 79.9} for i in range(200)]
+        with patch.dict(llm_reasoning_engine.MODEL_CTX_LIMITS, {"tiny": limit}):
+            result = await self.engine.reason("healing_diagnose", {"metrics_json": metrics})
+            assert result["action"] == "scale_up"
+            budget = limit - self.engine.cfg.max_tokens
+            assert llm_reasoning_engine.estimate_tokens(prompts[0]) <= budget
+            assert '"t": 199' in prompts[0] and '"t": 0,' not in prompts[0]
+
+            prompts.clear()
+            huge_log = "x" * (limit * 8)
+            result = await self.engine.reason("healing_diagnose", {"error_log": huge_log})
+        assert prompts == []  # Rejected locally
+        assert result == llm_reasoning_engine.MOCK_RESPONSES["healing_diagnose"]
+
@@ -6,6 +6,7 @@ import asyncio
 import pytest
 import sys
 import os
+from unittest.mock import MagicMock
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
 
@@ -107,3 +108,26 @@ class TestMasterOrchestrator:
         ex.failed_tasks = [f"t-{i}" for i in range(3)]  # 30% fail rate
         result = await self.orch._handle_failures(ex)
         assert result is True  # Should continue
+
+    @pytest.mark.asyncio
+    async def test_broken_plan_stream_cancels_early_tasks(self):
+        started = asyncio.Event()
+        cancelled = []
+        async def dispatch(ex, task):
+            started.set()
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                cancelled.append(task["task_id"])
+                raise
+        async def broken_stream():
+            yield {"task_id": "t0", "depends_on": []}
+            await started.wait()
+            raise RuntimeError("connection reset")
+        self.orch._dispatch_task = dispatch
+        self.orch.llm.reason_stream = MagicMock(return_value=broken_stream())
+
+        ex = GoalExecution(goal_id="g1", raw_text="train", user_id="u")
+        await self.orch._execute_goal(ex)
+        assert ex.status == "failed"
+        assert cancelled == ["t0"]